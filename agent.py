@@ -5,15 +5,32 @@ Agent模块 - 管理多轮对话和上下文
 支持OpenAI SDK格式的消息：system -> user -> assistant -> user -> assistant
 """
 
-from typing import List, Dict, Any, Optional, Callable
+import sys
+import types
+from collections import deque
+from typing import List, Dict, Any, Optional, Callable, Union
 from enum import Enum
 
+# 驻留的角色字符串常量 - 驻留后可用is做指针比较，
+# 比Enum属性访问+字符串比较快，热路径统一使用
+ROLE_SYSTEM = sys.intern('system')
+ROLE_USER = sys.intern('user')
+ROLE_ASSISTANT = sys.intern('assistant')
+
 
 class MessageRole(Enum):
-    """消息角色枚举"""
-    SYSTEM = 'system'
-    USER = 'user'
-    ASSISTANT = 'assistant'
+    """消息角色枚举（保留用于API兼容，内部以字符串常量为准）"""
+    SYSTEM = ROLE_SYSTEM
+    USER = ROLE_USER
+    ASSISTANT = ROLE_ASSISTANT
+
+
+# 导出时的角色前缀 - 以驻留角色字符串为键，取代逐条if/elif判断
+_EXPORT_PREFIX = {
+    ROLE_SYSTEM: '[SYSTEM] ',
+    ROLE_USER: '[USER] ',
+    ROLE_ASSISTANT: '[ASSISTANT] ',
+}
 
 
 class Agent:
@@ -48,13 +65,39 @@ class Agent:
         self.max_history = max_history
         self.on_stream = on_stream
 
-        # 消息历史 - OpenAI SDK格式
-        self.messages: List[Dict[str, Any]] = []
+        # 对话历史 - 环形缓冲，deque的maxlen自动以O(1)淘汰最旧消息
+        # system消息单独保存，不占用历史额度
+        self._system_msg: Optional[Dict[str, Any]] = None
+        self._history: deque = deque(maxlen=max_history)
+
+        # 按角色分类的视图 - 与_history共享同一批消息dict，随增删同步维护，
+        # 使get_user_messages/get_assistant_messages无需每次全量扫描
+        self._user_msgs: deque = deque()
+        self._assistant_msgs: deque = deque()
+
+        # 历史版本号与缓存快照 - 仅在历史真正变化后重建messages列表
+        self._version = 0
+        self._snapshot_version = -1
+        self._snapshot: List[Dict[str, Any]] = []
 
         # 如果有system prompt，添加到开头
         if system_prompt:
             self.set_system_prompt(system_prompt)
 
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """完整消息列表（OpenAI SDK格式，system消息在最前）
+
+        快照按版本号缓存，未发生变化时重复访问不产生新的列表分配
+        """
+        if self._snapshot_version != self._version:
+            if self._system_msg is not None:
+                self._snapshot = [self._system_msg, *self._history]
+            else:
+                self._snapshot = list(self._history)
+            self._snapshot_version = self._version
+        return self._snapshot
+
     def set_system_prompt(self, prompt: str) -> None:
         """
         设置系统提示词
@@ -64,14 +107,13 @@ class Agent:
         Args:
             prompt: 系统提示词
         """
-        # 检查是否已有system消息
-        if self.messages and self.messages[0].get('role') == MessageRole.SYSTEM.value:
-            self.messages[0]['content'] = prompt
-        else:
-            self.messages.insert(0, {
-                'role': MessageRole.SYSTEM.value,
-                'content': prompt
-            })
+        # 始终替换dict而不是原地改content - 已发给工作线程的
+        # 快照持有旧dict的引用，原地修改会产生跨线程竞态
+        self._system_msg = {
+            'role': ROLE_SYSTEM,
+            'content': prompt
+        }
+        self._version += 1
 
     def get_system_prompt(self) -> Optional[str]:
         """
@@ -80,13 +122,13 @@ class Agent:
         Returns:
             系统提示词，如果不存在返回None
         """
-        if self.messages and self.messages[0].get('role') == MessageRole.SYSTEM.value:
-            return self.messages[0].get('content')
+        if self._system_msg is not None:
+            return self._system_msg.get('content')
         return None
 
     def add_message(
         self,
-        role: MessageRole,
+        role: Union[MessageRole, str],
         content: Any,
         silent: bool = False
     ) -> None:
@@ -94,25 +136,97 @@ class Agent:
         添加消息到历史
 
         Args:
-            role: 消息角色（system/user/assistant）
+            role: 消息角色（MessageRole或'system'/'user'/'assistant'字符串）
             content: 消息内容（字符串或多模态内容列表）
-            silent: 是否静默添加（不触发历史清理）
+            silent: 保留参数（历史由deque的maxlen自动限制）
         """
-        self.messages.append({
-            'role': role.value,
+        # 统一为驻留的角色字符串，后续全部用is比较
+        role = sys.intern(role) if role.__class__ is str else role.value
+
+        if role is ROLE_SYSTEM:
+            self.set_system_prompt(content)
+            return
+
+        # 即将因maxlen溢出被淘汰的最旧消息，需要同步从角色视图中移除
+        if len(self._history) == self._history.maxlen:
+            self._discard_from_views(self._history[0])
+
+        # deque的maxlen会在O(1)时间内自动淘汰最旧的消息
+        msg = {
+            'role': role,
             'content': content
-        })
-
-        # 限制历史长度（保留system消息）
-        if not silent and len(self.messages) > self.max_history + 1:
-            # 保留第一条system消息，删除最早的对话
-            if self.messages[0].get('role') == MessageRole.SYSTEM.value:
-                # 删除最早的一对user-assistant消息
-                if len(self.messages) > 2:
-                    self.messages.pop(1)  # 删除第一个user
-                    self.messages.pop(1)  # 删除对应的assistant
-            else:
-                self.messages.pop(0)
+        }
+        self._history.append(msg)
+        self._version += 1
+
+        if role is ROLE_USER:
+            self._user_msgs.append(msg)
+        elif role is ROLE_ASSISTANT:
+            self._assistant_msgs.append(msg)
+
+    def _discard_from_views(self, msg: Dict[str, Any]) -> None:
+        """从角色视图中移除指定消息（按对象身份比较）"""
+        if self._user_msgs and self._user_msgs[0] is msg:
+            self._user_msgs.popleft()
+        elif self._assistant_msgs and self._assistant_msgs[0] is msg:
+            self._assistant_msgs.popleft()
+
+    def _replace_in_views(self, old: Dict[str, Any], new: Dict[str, Any]) -> None:
+        """在角色视图中按对象身份替换消息dict"""
+        role = new.get('role')
+        if role is ROLE_USER:
+            view = self._user_msgs
+        elif role is ROLE_ASSISTANT:
+            view = self._assistant_msgs
+        else:
+            return
+        for i, msg in enumerate(view):
+            if msg is old:
+                view[i] = new
+                break
+
+    def strip_old_images(self, keep_last: int = 1) -> int:
+        """
+        把较早轮次消息里的图片替换为文本占位
+
+        完整历史每轮都会重发给API，base64图片跟着重传N次就是
+        O(N²)的网络字节；助手回复过的图片不再需要参与后续推理
+
+        Args:
+            keep_last: 保留图片的最近用户消息条数
+
+        Returns:
+            被替换的图片数量
+        """
+        stripped = 0
+        kept = 0
+        for i in range(len(self._history) - 1, -1, -1):
+            msg = self._history[i]
+            content = msg.get('content')
+            if content.__class__ is not list:
+                continue
+            if not any(item.get('type') == 'image_url' for item in content):
+                continue
+            if kept < keep_last and msg.get('role') is ROLE_USER:
+                kept += 1
+                continue
+
+            # 构造新内容与新消息dict，不原地修改——
+            # 工作线程持有的快照可能还引用着旧dict
+            new_content = []
+            for item in content:
+                if item.get('type') == 'image_url':
+                    new_content.append({'type': 'text', 'text': '[图片已省略]'})
+                    stripped += 1
+                else:
+                    new_content.append(item)
+            new_msg = {'role': msg['role'], 'content': new_content}
+            self._replace_in_views(msg, new_msg)
+            self._history[i] = new_msg
+
+        if stripped:
+            self._version += 1
+        return stripped
 
     def get_messages(self) -> List[Dict[str, Any]]:
         """
@@ -121,7 +235,7 @@ class Agent:
         Returns:
             消息列表（OpenAI SDK格式）
         """
-        return self.messages.copy()
+        return self.messages
 
     def get_context(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
@@ -134,14 +248,14 @@ class Agent:
             消息列表
         """
         if limit is None:
-            return self.messages.copy()
-        elif self.messages and self.messages[0].get('role') == MessageRole.SYSTEM.value:
+            return self.messages
+        elif self._system_msg is not None:
             # 始终包含system消息
             if limit <= 1:
-                return [self.messages[0]]
-            return [self.messages[0]] + self.messages[-(limit - 1):]
+                return [self._system_msg]
+            return [self._system_msg, *list(self._history)[-(limit - 1):]]
         else:
-            return self.messages[-limit:]
+            return list(self._history)[-limit:]
 
     def clear_history(self, keep_system: bool = True) -> None:
         """
@@ -150,10 +264,12 @@ class Agent:
         Args:
             keep_system: 是否保留system prompt
         """
-        if keep_system and self.messages and self.messages[0].get('role') == MessageRole.SYSTEM.value:
-            self.messages = [self.messages[0]]
-        else:
-            self.messages = []
+        self._history.clear()
+        self._user_msgs.clear()
+        self._assistant_msgs.clear()
+        self._version += 1
+        if not keep_system:
+            self._system_msg = None
 
     def chat(
         self,
@@ -181,18 +297,17 @@ class Agent:
 
         try:
             if stream:
-                # 流式输出
-                full_content = ''
-                for chunk in self.ai_client.chat_stream(self.messages):
-                    if chunk.get('choices') and len(chunk['choices']) > 0:
-                        delta = chunk['choices'][0].get('delta', {})
-                        content = delta.get('content', '')
-                        if content:
-                            full_content += content
-                            if self.on_stream:
-                                self.on_stream(content)
+                # 流式输出 - 用列表缓冲片段，结束时一次join，避免O(n²)字符串拼接
+                full_parts = []
+                for delta in self.ai_client.chat_stream(self.messages):
+                    content = delta.content
+                    if content:
+                        full_parts.append(content)
+                        if self.on_stream:
+                            self.on_stream(content)
 
                 # 保存assistant回复
+                full_content = ''.join(full_parts)
                 self.add_message(MessageRole.ASSISTANT, full_content, silent=True)
                 return None
             else:
@@ -205,7 +320,10 @@ class Agent:
                 return response
         except Exception as e:
             # 发生错误，移除刚才添加的用户消息
-            self.messages.pop()
+            removed = self._history.pop()
+            if self._user_msgs and self._user_msgs[-1] is removed:
+                self._user_msgs.pop()
+            self._version += 1
             raise
 
     def set_on_stream(self, callback: Callable[[str], None]) -> None:
@@ -234,6 +352,15 @@ class Agent:
             max_history: 最大保留历史消息数
         """
         self.max_history = max_history
+        # 先一次性批量淘汰头部溢出消息并同步角色视图，
+        # 避免重建后对全部历史做一次全量重扫
+        overflow = len(self._history) - max_history
+        if overflow > 0:
+            for _ in range(overflow):
+                self._discard_from_views(self._history.popleft())
+        # 重建deque以应用新的maxlen
+        self._history = deque(self._history, maxlen=max_history)
+        self._version += 1
 
     def get_history_count(self) -> int:
         """
@@ -242,10 +369,7 @@ class Agent:
         Returns:
             历史消息数量
         """
-        count = len(self.messages)
-        if self.messages and self.messages[0].get('role') == MessageRole.SYSTEM.value:
-            count -= 1
-        return max(0, count)
+        return len(self._history)
 
     def get_user_messages(self) -> List[Dict[str, Any]]:
         """
@@ -254,7 +378,7 @@ class Agent:
         Returns:
             用户消息列表
         """
-        return [msg for msg in self.messages if msg.get('role') == MessageRole.USER.value]
+        return list(self._user_msgs)
 
     def get_assistant_messages(self) -> List[Dict[str, Any]]:
         """
@@ -263,7 +387,7 @@ class Agent:
         Returns:
             助手消息列表
         """
-        return [msg for msg in self.messages if msg.get('role') == MessageRole.ASSISTANT.value]
+        return list(self._assistant_msgs)
 
     def export_messages(self) -> str:
         """
@@ -273,29 +397,27 @@ class Agent:
             格式化的消息历史字符串
         """
         lines = []
+        # 热循环局部绑定，省去每次迭代的属性查找
+        lines_append = lines.append
+        prefix_get = _EXPORT_PREFIX.get
+
         for msg in self.messages:
-            role = msg.get('role', 'unknown')
+            prefix = prefix_get(msg.get('role'))
+            if prefix is None:
+                continue
             content = msg.get('content', '')
 
-            # 处理多模态内容
+            # 处理多模态内容 - 取第一个文本项，否则标注图片/多模态
             if isinstance(content, list):
-                content_text = '[多模态消息]'
-                for item in content:
-                    if item.get('type') == 'text':
-                        content_text = item.get('text', '')
-                        break
-                    elif item.get('type') == 'image_url':
-                        content_text = '[图片]'
-                        break
+                content_text = next(
+                    (item.get('text', '') for item in content
+                     if item.get('type') == 'text'),
+                    '[图片]' if any(item.get('type') == 'image_url'
+                                  for item in content) else '[多模态消息]')
             else:
                 content_text = content
 
-            if role == MessageRole.SYSTEM.value:
-                lines.append(f"[SYSTEM] {content_text}")
-            elif role == MessageRole.USER.value:
-                lines.append(f"[USER] {content_text}")
-            elif role == MessageRole.ASSISTANT.value:
-                lines.append(f"[ASSISTANT] {content_text}")
+            lines_append(prefix + content_text)
 
         return '\n\n'.join(lines)
 
@@ -305,8 +427,8 @@ class Agent:
         return f"Agent(system_prompt='{system_prompt[:30]}...', history={self.get_history_count()} messages)"
 
 
-# 预设的System Prompt模板
-PRESET_SYSTEM_PROMPTS = {
+# 预设的System Prompt模板（只读代理，防止意外修改）
+PRESET_SYSTEM_PROMPTS = types.MappingProxyType({
     'default': """你是一个有用的AI助手。你会以友好、专业的方式回答用户的问题，提供准确、有用的信息。""",
 
     'coding': """你是一个专业的编程助手。你精通多种编程语言，能够帮助用户编写、调试、优化代码。你会提供清晰的代码解释和最佳实践建议。""",
@@ -316,7 +438,7 @@ PRESET_SYSTEM_PROMPTS = {
     'analysis': """你是一个专业的数据分析师。你能够分析数据、识别模式、发现洞察，并提供清晰的数据可视化建议和解释。""",
 
     'translator': """你是一个专业的翻译助手。你精通多种语言，能够准确、流畅地进行翻译，同时保持原文的风格和语调。你会根据上下文调整翻译策略。"""
-}
+})
 
 def create_agent(
     preset: str = 'default',
@@ -336,7 +458,12 @@ def create_agent(
     Returns:
         Agent实例
     """
-    system_prompt = custom_prompt or PRESET_SYSTEM_PROMPTS.get(preset, PRESET_SYSTEM_PROMPTS['default'])
+    # custom_prompt优先，直接短路；预设查找只做一次dict访问
+    if custom_prompt is not None:
+        system_prompt = custom_prompt
+    else:
+        system_prompt = (PRESET_SYSTEM_PROMPTS.get(preset)
+                         or PRESET_SYSTEM_PROMPTS['default'])
     return Agent(system_prompt=system_prompt, ai_client=ai_client, **kwargs)
 
 
@@ -11,8 +11,6 @@ from PyQt6.QtWidgets import QApplication, QSplashScreen
 from PyQt6.QtGui import QPixmap, QFont, QColor
 from PyQt6.QtCore import Qt
 
-from src.ui.chat_window import ChatWindow
-from src.ui.floating_widget import FloatingWidget
 from src.ai_client import AIClient
 from src.config_manager import ConfigManager
 
@@ -27,8 +25,12 @@ class WindyApp(QApplication):
         self.config_manager = ConfigManager()
         self.config = self.config_manager.load_config()
 
+        # 退出时确保延迟写盘的配置落盘
+        self.aboutToQuit.connect(self.config_manager.flush)
+
         # 初始化AI客户端
         self.ai_client = AIClient(self.config['ai'])
+        self.aboutToQuit.connect(self.ai_client.close)
 
         # 创建窗口
         self.chat_window = None
@@ -72,6 +74,10 @@ class WindyApp(QApplication):
 
     def create_windows(self):
         """创建窗口"""
+        # UI模块在启动画面显示之后再导入，缩短首帧出现前的等待
+        from src.ui.chat_window import ChatWindow
+        from src.ui.floating_widget import FloatingWidget
+
         # 创建悬浮助手（先创建）
         self.floating_widget = FloatingWidget(None)
 
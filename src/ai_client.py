@@ -5,11 +5,51 @@ AI客户端封装
 支持OpenAI SDK兼容的API
 """
 
-import base64
+import functools
 import os
+
+# pybase64的SIMD编解码比stdlib快一个量级，未安装时回退stdlib
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+from collections import namedtuple
 from typing import List, Dict, Any, Optional, AsyncGenerator
-from openai import OpenAI
-import httpx
+
+# 流式响应增量 - 每个chunk只构造一个轻量namedtuple，
+# 取代此前每chunk重建的嵌套dict+list结构
+StreamDelta = namedtuple('StreamDelta', ['content', 'role', 'index'])
+
+
+# 扩展名到MIME类型映射 - 模块级常量，避免每次调用重建
+_EXT_MIME = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+}
+
+
+@functools.lru_cache(maxsize=16)
+def _encode_cached(image_path: str, mtime_ns: int, size: int) -> str:
+    """
+    读取图片文件并编码为base64 data URL（按路径+mtime+大小缓存）
+
+    mtime_ns/size参与缓存键，文件被修改后缓存自动失效
+    """
+    with open(image_path, 'rb') as f:
+        raw = f.read()
+
+    # 按扩展名查表检测MIME类型
+    ext = os.path.splitext(image_path)[1].lower()
+    mime_type = _EXT_MIME.get(ext, 'image/jpeg')
+
+    # 保持bytes形态拼接，最后一次性解码，避免中间str副本
+    b64 = base64.b64encode(raw)
+    return b''.join(
+        [b'data:', mime_type.encode('ascii'), b';base64,', b64]
+    ).decode('ascii')
 
 
 class AIClient:
@@ -19,11 +59,25 @@ class AIClient:
     """
 
     def __init__(self, config: Dict[str, Any]):
+        # 延迟导入重量级SDK，避免未用到AI功能的启动路径提前付出导入成本
+        import httpx
+        from openai import OpenAI
+
         self.config = config
-        # 创建不使用代理的 httpx 客户端
+        # 预取请求热路径参数，避免每次请求重复dict查找
+        self._model = config.get('model')
+        self._temperature = config.get('temperature', 0.7)
+        # 长生命周期的httpx客户端 - 连接池+HTTP/2跨请求复用，
+        # 配置更新时不重建，避免冷TLS握手
+        self._http = httpx.Client(
+            http2=True,
+            timeout=60.0,
+            limits=httpx.Limits(max_keepalive_connections=8, max_connections=16),
+        )
         self.client = OpenAI(
             api_key=config.get('apiKey'),
             base_url=config.get('baseUrl'),
+            http_client=self._http,
         )
 
     def chat(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -45,9 +99,9 @@ class AIClient:
             formatted_messages = self._format_messages(messages)
 
             completion = self.client.chat.completions.create(
-                model=self.config.get('model'),
+                model=self._model,
                 messages=formatted_messages,
-                temperature=self.config.get('temperature', 0.7)
+                temperature=self._temperature
             )
 
             return {
@@ -81,33 +135,25 @@ class AIClient:
             messages: OpenAI SDK格式的消息列表
 
         Yields:
-            流式响应块
+            StreamDelta(content, role, index)
         """
         try:
             formatted_messages = self._format_messages(messages)
 
             stream = self.client.chat.completions.create(
-                model=self.config.get('model'),
+                model=self._model,
                 messages=formatted_messages,
-                temperature=self.config.get('temperature', 0.7),
+                temperature=self._temperature,
                 stream=True
             )
 
             for chunk in stream:
-                yield {
-                    'id': chunk.id,
-                    'choices': [
-                        {
-                            'index': choice.index,
-                            'delta': {
-                                'role': choice.delta.role,
-                                'content': choice.delta.content
-                            } if choice.delta else {}
-                        }
-                        for choice in chunk.choices
-                    ],
-                    'model': chunk.model
-                }
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                delta = choice.delta
+                if delta is not None:
+                    yield StreamDelta(delta.content, delta.role, choice.index)
         except Exception as e:
             raise Exception(f'AI流式请求失败: {str(e)}')
 
@@ -124,19 +170,18 @@ class AIClient:
         formatted = []
 
         for msg in messages:
-            if isinstance(msg.get('content'), list):
-                # 多模态消息
+            content = msg.get('content')
+            # 直接比较类型比isinstance更快，content要么是str要么是list
+            if content.__class__ is list:
+                # 多模态消息 - 形状已正确的item直接复用引用，仅在
+                # 需要做路径→base64转换时才构造新dict
                 content_list = []
-                for item in msg['content']:
+                for item in content:
                     if item.get('type') == 'image_url':
-                        # 处理base64图片
                         url = item['image_url']['url']
                         if url.startswith('data:image'):
-                            # 已经是data URL格式，直接使用
-                            content_list.append({
-                                'type': 'image_url',
-                                'image_url': {'url': url}
-                            })
+                            # 已经是data URL格式，直接复用原dict
+                            content_list.append(item)
                         else:
                             # 假设是文件路径，转换为base64
                             content_list.append({
@@ -144,21 +189,15 @@ class AIClient:
                                 'image_url': {'url': self._image_to_base64(url)}
                             })
                     elif item.get('type') == 'text':
-                        content_list.append({
-                            'type': 'text',
-                            'text': item['text']
-                        })
+                        content_list.append(item)
 
                 formatted.append({
                     'role': msg['role'],
                     'content': content_list
                 })
             else:
-                # 普通文本消息
-                formatted.append({
-                    'role': msg['role'],
-                    'content': msg.get('content', '')
-                })
+                # 普通文本消息 - 已经是正确形状，直接复用
+                formatted.append(msg)
 
         return formatted
 
@@ -173,23 +212,9 @@ class AIClient:
             base64 data URL
         """
         try:
-            with open(image_path, 'rb') as f:
-                image_data = f.read()
-            base64_data = base64.b64encode(image_data).decode('utf-8')
-
-            # 检测图片类型
-            if image_path.endswith('.png'):
-                mime_type = 'image/png'
-            elif image_path.endswith('.jpg') or image_path.endswith('.jpeg'):
-                mime_type = 'image/jpeg'
-            elif image_path.endswith('.gif'):
-                mime_type = 'image/gif'
-            elif image_path.endswith('.webp'):
-                mime_type = 'image/webp'
-            else:
-                mime_type = 'image/jpeg'
-
-            return f'data:{mime_type};base64,{base64_data}'
+            # 同一文件重复发送时直接命中缓存，无需重新读取和编码
+            st = os.stat(image_path)
+            return _encode_cached(image_path, st.st_mtime_ns, st.st_size)
         except Exception as e:
             raise Exception(f'图片转换失败: {str(e)}')
 
@@ -200,14 +225,26 @@ class AIClient:
         Args:
             config: 新的配置
         """
+        old_base_url = self.config.get('baseUrl')
+        old_api_key = self.config.get('apiKey')
+
         self.config.update(config)
-        # 创建不使用代理的 httpx 客户端
-        #http_client = httpx.Client()
-        self.client = OpenAI(
-            api_key=self.config.get('apiKey'),
-            base_url=self.config.get('baseUrl'),
-            #http_client=http_client
-        )
+        self._model = self.config.get('model')
+        self._temperature = self.config.get('temperature', 0.7)
+
+        # 仅在地址或密钥变化时重建OpenAI客户端，连接池始终复用
+        if (self.config.get('baseUrl') != old_base_url
+                or self.config.get('apiKey') != old_api_key):
+            from openai import OpenAI
+            self.client = OpenAI(
+                api_key=self.config.get('apiKey'),
+                base_url=self.config.get('baseUrl'),
+                http_client=self._http,
+            )
+
+    def close(self):
+        """关闭底层HTTP连接池（应用退出时调用）"""
+        self._http.close()
 
 
 # 示例使用
@@ -6,7 +6,13 @@
 
 import json
 import os
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 class ConfigManager:
@@ -14,13 +20,34 @@ class ConfigManager:
 
     def __init__(self, config_file: str = 'config.json'):
         self.config_file = config_file
+        self._flat: Dict[str, Any] = {}
+        # 延迟写盘状态 - set()只改内存并安排一次合并写入
+        self._dirty = False
+        self._write_pending: Optional[threading.Timer] = None
         self.config = self.load_config()
 
+    def _flatten(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """将嵌套配置展平为 {'ai.apiKey': ...} 形式的单层dict，供get快速查找"""
+        flat = {}
+
+        def walk(node: Dict[str, Any], prefix: str):
+            for k, v in node.items():
+                key = f'{prefix}.{k}' if prefix else k
+                if isinstance(v, dict):
+                    walk(v, key)
+                else:
+                    flat[key] = v
+
+        walk(config, '')
+        return flat
+
     def load_config(self) -> Dict[str, Any]:
         """加载配置"""
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            with open(self.config_file, 'rb') as f:
+                raw = f.read()
+            config = orjson.loads(raw) if orjson else json.loads(raw)
+            self._flat = self._flatten(config)
             return config
         except FileNotFoundError:
             # 创建默认配置
@@ -42,32 +69,34 @@ class ConfigManager:
             return default_config
         except json.JSONDecodeError as e:
             print(f'配置文件格式错误: {e}')
+            self._flat = {}
             return {}
 
     def save_config(self, config: Dict[str, Any]) -> bool:
-        """保存配置"""
+        """保存配置（写临时文件后原子替换，避免写到一半崩溃损坏配置）"""
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+            tmp_file = self.config_file + '.tmp'
+            if orjson:
+                with open(tmp_file, 'wb') as f:
+                    f.write(orjson.dumps(config, option=orjson.OPT_INDENT_2))
+            else:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(config, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self.config_file)
             self.config = config
+            self._flat = self._flatten(config)
+            self._dirty = False
             return True
         except Exception as e:
             print(f'保存配置失败: {e}')
             return False
 
     def get(self, key: str, default=None):
-        """获取配置值"""
-        keys = key.split('.')
-        value = self.config
-        for k in keys:
-            if isinstance(value, dict) and k in value:
-                value = value[k]
-            else:
-                return default
-        return value
+        """获取配置值（单次dict查找，无需逐层遍历）"""
+        return self._flat.get(key, default)
 
     def set(self, key: str, value: Any):
-        """设置配置值"""
+        """设置配置值（只改内存，稍后合并写盘，连续set只触发一次写入）"""
         keys = key.split('.')
         config = self.config
         for k in keys[:-1]:
@@ -75,4 +104,22 @@ class ConfigManager:
                 config[k] = {}
             config = config[k]
         config[keys[-1]] = value
-        self.save_config(self.config)
+        self._flat[key] = value
+        self._dirty = True
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        """安排一次延迟写盘（200ms内的重复set会被合并）"""
+        if self._write_pending is not None:
+            self._write_pending.cancel()
+        self._write_pending = threading.Timer(0.2, self.flush)
+        self._write_pending.daemon = True
+        self._write_pending.start()
+
+    def flush(self):
+        """立即把未落盘的修改写入磁盘（应用退出时调用）"""
+        if self._write_pending is not None:
+            self._write_pending.cancel()
+            self._write_pending = None
+        if self._dirty:
+            self.save_config(self.config)
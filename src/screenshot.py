@@ -4,11 +4,24 @@
 屏幕截图功能
 """
 
-import base64
+from __future__ import annotations
+
 import io
+
+# pybase64的SIMD编解码比stdlib快一个量级，未安装时回退stdlib
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
 from typing import Optional
-from PIL import Image
-import mss
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+
+# 图片格式到MIME类型映射 - 模块级常量，避免每次调用重建
+_FORMAT_MIME = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+}
 
 
 class ScreenshotCapture:
@@ -18,7 +31,17 @@ class ScreenshotCapture:
     """
 
     def __init__(self):
+        # 延迟导入mss - 仅在真正需要截图时才付出导入成本
+        import mss
         self.sct = mss.mss()
+        # 缓存显示器信息 - mss每次访问monitors都会重新查询系统
+        self._monitors = list(self.sct.monitors)
+        self._monitor_count = len(self._monitors)
+
+    def refresh_monitors(self) -> None:
+        """重新查询显示器信息（显示器接入/拔出后调用）"""
+        self._monitors = list(self.sct.monitors)
+        self._monitor_count = len(self._monitors)
 
     def capture_screen(self, monitor: int = 1) -> Optional[Image.Image]:
         """
@@ -30,19 +53,24 @@ class ScreenshotCapture:
         Returns:
             PIL Image对象
         """
+        import numpy as np
+        from PIL import Image
+
         try:
-            # 获取显示器信息
-            monitors = self.sct.monitors
-            if monitor >= len(monitors):
+            # 获取显示器信息（使用缓存）
+            if monitor >= self._monitor_count:
                 monitor = 1
 
-            monitor_info = monitors[monitor]
+            monitor_info = self._monitors[monitor]
 
             # 截图
             screenshot = self.sct.grab(monitor_info)
 
-            # 转换为PIL Image
-            img = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
+            # 转换为PIL Image - 直接在原生BGRA缓冲上建numpy视图并向量化换通道，
+            # 避免screenshot.rgb在Python层逐字节重排生成的整帧拷贝
+            arr = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(
+                screenshot.height, screenshot.width, 4)
+            img = Image.fromarray(arr[:, :, [2, 1, 0]], 'RGB')
 
             return img
         except Exception as e:
@@ -57,47 +85,88 @@ class ScreenshotCapture:
             PIL Image对象列表
         """
         images = []
-        monitors = self.sct.monitors
 
-        for i, monitor in enumerate(monitors[1:], start=1):
+        for i, monitor in enumerate(self._monitors[1:], start=1):
             img = self.capture_screen(i)
             if img:
                 images.append(img)
 
         return images
 
-    def capture_to_base64(self, monitor: int = 1, format: str = 'JPEG') -> Optional[str]:
+    def capture_to_bytes(
+        self,
+        monitor: int = 1,
+        format: str = 'WEBP',
+        quality: int = 80,
+        max_dim: int = 1600
+    ) -> Optional[tuple[bytes, str]]:
         """
-        捕获屏幕并转换为base64 data URL
+        捕获屏幕并编码为压缩图片字节
+
+        默认WEBP q=80并限制最长边1600px——视觉模型通常不需要更高分辨率，
+        编码后体积比默认JPEG小数倍，直接减少上传字节数和vision token数
 
         Args:
             monitor: 显示器编号
             format: 图片格式 (JPEG, PNG, WEBP)
+            quality: 压缩质量 (JPEG/WEBP有效)
+            max_dim: 最长边像素上限，0表示不缩放
 
         Returns:
-            base64 data URL字符串
+            (图片字节, MIME类型)元组，失败返回None
         """
+        from PIL import Image
+
         try:
             img = self.capture_screen(monitor)
             if not img:
                 return None
 
-            # 转换为base64
+            # 先缩放再编码，像素数下降后所有下游开销等比例降低
+            if max_dim and max(img.size) > max_dim:
+                img.thumbnail((max_dim, max_dim), Image.LANCZOS)
+
             buffered = io.BytesIO()
-            img.save(buffered, format=format)
-            img_str = base64.b64encode(buffered.getvalue()).decode('utf-8')
+            if format == 'WEBP':
+                img.save(buffered, format=format, quality=quality, method=6)
+            elif format == 'JPEG':
+                img.save(buffered, format=format, quality=quality,
+                         optimize=True, subsampling=2)
+            else:
+                img.save(buffered, format=format, optimize=True)
+
+            return buffered.getvalue(), _FORMAT_MIME.get(format, 'image/jpeg')
+        except Exception as e:
+            print(f'截图编码失败: {str(e)}')
+            return None
 
-            mime_type = {
-                'JPEG': 'image/jpeg',
-                'PNG': 'image/png',
-                'WEBP': 'image/webp'
-            }.get(format, 'image/jpeg')
+    def capture_to_base64(
+        self,
+        monitor: int = 1,
+        format: str = 'WEBP',
+        quality: int = 80,
+        max_dim: int = 1600
+    ) -> Optional[str]:
+        """
+        捕获屏幕并转换为base64 data URL
 
-            return f'data:{mime_type};base64,{img_str}'
-        except Exception as e:
-            print(f'转换base64失败: {str(e)}')
+        Args:
+            monitor: 显示器编号
+            format: 图片格式 (JPEG, PNG, WEBP)
+            quality: 压缩质量 (JPEG/WEBP有效)
+            max_dim: 最长边像素上限，0表示不缩放
+
+        Returns:
+            base64 data URL字符串
+        """
+        result = self.capture_to_bytes(monitor, format, quality, max_dim)
+        if result is None:
             return None
 
+        raw, mime_type = result
+        img_str = base64.b64encode(raw).decode('ascii')
+        return f'data:{mime_type};base64,{img_str}'
+
     def capture_to_file(self, filepath: str, monitor: int = 1, format: str = 'JPEG') -> bool:
         """
         捕获屏幕并保存到文件
@@ -129,7 +198,7 @@ class ScreenshotCapture:
             显示器信息列表
         """
         monitors = []
-        for i, monitor in enumerate(self.sct.monitors[1:], start=1):
+        for i, monitor in enumerate(self._monitors[1:], start=1):
             monitors.append({
                 'index': i,
                 'left': monitor['left'],
@@ -140,6 +209,34 @@ class ScreenshotCapture:
         return monitors
 
 
+class ScreenshotWorker(QObject):
+    """
+    截图工作对象 - 配合QThread在后台线程执行截图
+    避免grab+解码阻塞Qt主事件循环造成界面卡顿
+    """
+    captured = pyqtSignal(object)  # 携带PIL Image对象（失败时为None）
+    captured_bytes = pyqtSignal(object)  # (图片字节, MIME)元组（失败时为None）
+
+    def __init__(self):
+        super().__init__()
+        # mss实例不是线程安全的，必须在工作线程首次run时创建
+        self._cap: Optional[ScreenshotCapture] = None
+
+    @pyqtSlot()
+    def run(self):
+        """执行截图并通过captured信号发回主线程"""
+        if self._cap is None:
+            self._cap = ScreenshotCapture()
+        self.captured.emit(self._cap.capture_screen())
+
+    @pyqtSlot()
+    def run_to_bytes(self):
+        """截图并压缩编码，通过captured_bytes信号发回主线程"""
+        if self._cap is None:
+            self._cap = ScreenshotCapture()
+        self.captured_bytes.emit(self._cap.capture_to_bytes())
+
+
 # 示例使用
 if __name__ == '__main__':
     capture = ScreenshotCapture()
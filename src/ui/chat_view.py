@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+虚拟化聊天视图
+QListView + 模型/委托按需绘制消息气泡
+只有可见行才会绘制，滚动与重绘开销不随历史长度增长
+通过配置项 ui.virtualList 启用，默认仍使用气泡控件布局
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import (
+    Qt, QAbstractListModel, QModelIndex, QRect, QSize, QVariant
+)
+from PyQt6.QtGui import QColor, QFontMetrics, QPainter, QPixmap
+from PyQt6.QtWidgets import QListView, QStyledItemDelegate, QStyleOptionViewItem
+
+from src.ui import image_cache
+
+# 自定义数据角色
+ROLE_ROLE = Qt.ItemDataRole.UserRole + 1       # 消息角色字符串
+IMAGE_URL_ROLE = Qt.ItemDataRole.UserRole + 2  # 图片data URL（无图片为None）
+
+# 气泡配色（与MessageBubble一致）
+_USER_BG = QColor('#f5576c')
+_ASSISTANT_BG = QColor('#16213e')
+_TEXT_COLOR = QColor('#eaeaea')
+
+_BUBBLE_RADIUS = 16
+_PADDING = 12
+_MAX_TEXT_WIDTH = 480
+_IMAGE_WIDTH = 300
+
+
+def _content_to_text(content: Any) -> Tuple[str, Optional[str]]:
+    """拆出消息内容中的文本和图片URL"""
+    if isinstance(content, list):
+        text = ''
+        image_url = None
+        for item in content:
+            if item.get('type') == 'text':
+                text = item.get('text', '')
+            elif item.get('type') == 'image_url':
+                image_url = item['image_url']['url']
+        return text, image_url
+    return content or '', None
+
+
+class ChatModel(QAbstractListModel):
+    """聊天消息模型 - 存储(role, content)，增量插入行"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._messages: List[Tuple[str, Any]] = []
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return len(self._messages)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._messages):
+            return None
+
+        msg_role, content = self._messages[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return _content_to_text(content)[0]
+        if role == ROLE_ROLE:
+            return msg_role
+        if role == IMAGE_URL_ROLE:
+            return _content_to_text(content)[1]
+        return None
+
+    def append_message(self, msg_role: str, content: Any) -> int:
+        """追加一条消息，返回行号"""
+        row = len(self._messages)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._messages.append((msg_role, content))
+        self.endInsertRows()
+        return row
+
+    def append_to_last(self, text: str) -> None:
+        """向最后一条消息追加文本（流式输出）"""
+        if not self._messages:
+            return
+        row = len(self._messages) - 1
+        msg_role, content = self._messages[row]
+        if isinstance(content, str):
+            self._messages[row] = (msg_role, content + text)
+            idx = self.index(row)
+            self.dataChanged.emit(idx, idx)
+
+    def clear(self) -> None:
+        """清空全部消息"""
+        self.beginResetModel()
+        self._messages.clear()
+        self.endResetModel()
+
+
+class ChatBubbleDelegate(QStyledItemDelegate):
+    """消息气泡委托 - 直接用QPainter绘制气泡，不创建子控件"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # 按(行, 可用宽度)缓存尺寸，避免每次布局重新测量文本
+        self._size_cache: Dict[Tuple[int, int], QSize] = {}
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem,
+              index: QModelIndex) -> None:
+        text = index.data(Qt.ItemDataRole.DisplayRole) or ''
+        msg_role = index.data(ROLE_ROLE)
+        image_url = index.data(IMAGE_URL_ROLE)
+        is_user = msg_role == 'user'
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        fm = QFontMetrics(option.font)
+        text_width = min(_MAX_TEXT_WIDTH, option.rect.width() - 4 * _PADDING)
+        text_rect = fm.boundingRect(
+            0, 0, text_width, 0,
+            Qt.TextFlag.TextWordWrap, text)
+
+        bubble_width = text_rect.width() + 2 * _PADDING
+        bubble_height = text_rect.height() + 2 * _PADDING
+
+        pixmap = None
+        if image_url:
+            pixmap = image_cache.scaled_pixmap(image_url, _IMAGE_WIDTH)
+            if pixmap:
+                bubble_width = max(bubble_width, pixmap.width() + 2 * _PADDING)
+                bubble_height += pixmap.height() + _PADDING
+
+        # 用户消息靠右，助手消息靠左
+        if is_user:
+            x = option.rect.right() - bubble_width - _PADDING
+        else:
+            x = option.rect.left() + _PADDING
+        y = option.rect.top() + _PADDING // 2
+
+        bubble_rect = QRect(int(x), y, int(bubble_width), int(bubble_height))
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(_USER_BG if is_user else _ASSISTANT_BG)
+        painter.drawRoundedRect(bubble_rect, _BUBBLE_RADIUS, _BUBBLE_RADIUS)
+
+        content_y = bubble_rect.top() + _PADDING
+        if pixmap:
+            painter.drawPixmap(bubble_rect.left() + _PADDING, content_y, pixmap)
+            content_y += pixmap.height() + _PADDING
+
+        painter.setPen(_TEXT_COLOR)
+        painter.drawText(
+            QRect(bubble_rect.left() + _PADDING, content_y,
+                  text_rect.width(), text_rect.height()),
+            Qt.TextFlag.TextWordWrap, text)
+        painter.restore()
+
+    def sizeHint(self, option: QStyleOptionViewItem,
+                 index: QModelIndex) -> QSize:
+        key = (index.row(), option.rect.width())
+        cached = self._size_cache.get(key)
+        if cached is not None:
+            return cached
+
+        text = index.data(Qt.ItemDataRole.DisplayRole) or ''
+        image_url = index.data(IMAGE_URL_ROLE)
+
+        fm = QFontMetrics(option.font)
+        text_width = min(_MAX_TEXT_WIDTH, max(option.rect.width(), 100) - 4 * _PADDING)
+        text_rect = fm.boundingRect(
+            0, 0, text_width, 0,
+            Qt.TextFlag.TextWordWrap, text)
+
+        height = text_rect.height() + 3 * _PADDING
+        if image_url:
+            pixmap = image_cache.scaled_pixmap(image_url, _IMAGE_WIDTH)
+            if pixmap:
+                height += pixmap.height() + _PADDING
+
+        size = QSize(option.rect.width(), height)
+        self._size_cache[key] = size
+        return size
+
+    def invalidate_row(self, row: int) -> None:
+        """丢弃某行的尺寸缓存（流式更新后调用）"""
+        self._size_cache = {
+            k: v for k, v in self._size_cache.items() if k[0] != row}
+
+
+def create_chat_view(parent=None) -> Tuple[QListView, ChatModel, ChatBubbleDelegate]:
+    """创建配置好的虚拟化聊天视图"""
+    model = ChatModel(parent)
+    delegate = ChatBubbleDelegate(parent)
+
+    view = QListView(parent)
+    view.setModel(model)
+    view.setItemDelegate(delegate)
+    view.setUniformItemSizes(False)
+    view.setLayoutMode(QListView.LayoutMode.Batched)
+    view.setBatchSize(32)
+    view.setSelectionMode(QListView.SelectionMode.NoSelection)
+    view.setVerticalScrollMode(QListView.ScrollMode.ScrollPerPixel)
+    view.setStyleSheet("""
+        QListView {
+            border: none;
+            background-color: #1a1a2e;
+        }
+    """)
+
+    # 流式更新后丢弃对应行的尺寸缓存
+    model.dataChanged.connect(
+        lambda top_left, *_: delegate.invalidate_row(top_left.row()))
+
+    return view, model, delegate
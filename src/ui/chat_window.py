@@ -4,19 +4,38 @@
 聊天窗口
 """
 
+import os
 import sys
 import json
-from typing import List, Dict, Any
+from dataclasses import dataclass
+
+# pybase64的SIMD编解码比stdlib快一个量级，未安装时回退stdlib
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+from typing import List, Dict, Any, Optional
+
+# orjson的C编码器在长字符串为主的负载上比stdlib快一个量级，
+# 未安装时回退stdlib json（与config_manager同样的策略）
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTextEdit,
     QPushButton, QLabel, QScrollArea, QFrame, QFileDialog,
-    QDialog, QLineEdit, QDoubleSpinBox, QMessageBox, QSpacerItem
+    QMessageBox
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer
-from PyQt6.QtGui import QImage, QPixmap, QPainter, QColor, QResizeEvent
+from PyQt6.QtCore import (
+    Qt, QObject, QBuffer, QIODevice, QMetaObject, QRunnable, QThread,
+    QThreadPool, pyqtSignal, pyqtSlot, QTimer, Q_ARG
+)
+from PyQt6.QtGui import QImage, QPixmap, QPainter, QColor, QResizeEvent, QTextCursor
 
-from src.screenshot import ScreenshotCapture
+from src.screenshot import ScreenshotWorker
+from src.ui import image_cache
 from agent import Agent, MessageRole, PRESET_SYSTEM_PROMPTS
 
 
@@ -30,11 +49,13 @@ class ChatLogger:
         Args:
             log_dir: 日志目录
         """
-        import os
         self.log_dir = log_dir
         # 创建日志目录
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
+        # 增量JSONL会话日志（首次写入时才打开）
+        self._session_file = None
+        self._session_path = None
 
     def save_messages(self, messages: List[Dict[str, Any]]) -> str:
         """
@@ -51,16 +72,61 @@ class ChatLogger:
         filename = f'聊天日志_{timestamp}.json'
         filepath = f'{self.log_dir}/{filename}'
 
-        # 保存到文件
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump({
-                'timestamp': datetime.now().isoformat(),
-                'message_count': len(messages),
-                'messages': messages
-            }, f, ensure_ascii=False, indent=2)
+        payload = {
+            'timestamp': datetime.now().isoformat(),
+            'message_count': len(messages),
+            'messages': messages
+        }
+
+        # 保存到文件 - orjson一次性序列化为bytes后整块写入
+        if orjson is not None:
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+        else:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False, indent=2)
 
         return filepath
 
+    def append_message(self, msg: Dict[str, Any]) -> None:
+        """
+        追加单条消息到会话JSONL日志
+
+        每条消息发生时写一行，序列化成本摊到整个会话里，
+        关窗不再需要一次性序列化全部历史，进程崩溃也不丢已写内容
+
+        写入失败（日志目录被删、磁盘满等）只打印警告，不影响对话
+
+        Args:
+            msg: 单条消息（OpenAI SDK格式）
+        """
+        try:
+            if self._session_file is None:
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                self._session_path = f'{self.log_dir}/聊天日志_{timestamp}.jsonl'
+                self._session_file = open(self._session_path, 'ab')
+
+            if orjson is not None:
+                line = orjson.dumps(msg)
+            else:
+                line = json.dumps(msg, ensure_ascii=False).encode('utf-8')
+            self._session_file.write(line + b'\n')
+            self._session_file.flush()
+        except Exception as e:
+            print(f'写入日志失败: {e}')
+
+    def close(self) -> Optional[str]:
+        """
+        关闭会话日志
+
+        Returns:
+            日志文件路径，本次会话没有消息时返回None
+        """
+        if self._session_file is not None:
+            self._session_file.close()
+            self._session_file = None
+        return self._session_path
+
     def log_to_console(self, messages: List[Dict[str, Any]]) -> None:
         """
         打印消息到控制台
@@ -93,30 +159,232 @@ class ChatLogger:
         print("="*60 + "\n")
 
 
-class ChatThread(QThread):
-    """聊天请求线程"""
-    stream_received = pyqtSignal(str)  # 流式内容信号
-    stream_finished = pyqtSignal(str)  # 流式完成信号
-    error_occurred = pyqtSignal(str)
+class ChatRequestWorker(QRunnable):
+    """
+    聊天请求任务 - 跑在全局QThreadPool上
+    复用池中线程，省掉每条消息创建/销毁一个QThread的开销
+    用QMetaObject.invokeMethod直接排队调用窗口槽，
+    省掉信号对象和一层信号/槽中转
+    """
 
-    def __init__(self, ai_client, messages):
+    def __init__(self, ai_client, messages, window):
         super().__init__()
         self.ai_client = ai_client
         self.messages = messages
-        self.full_content = ''
+        self._window = window
+
+    def _invoke(self, slot: str, arg: str):
+        """跨线程排队调用窗口槽"""
+        QMetaObject.invokeMethod(
+            self._window, slot,
+            Qt.ConnectionType.QueuedConnection,
+            Q_ARG(str, arg))
 
     def run(self):
+        parts = []
         try:
-            for chunk in self.ai_client.chat_stream(self.messages):
-                if chunk.get('choices') and len(chunk['choices']) > 0:
-                    delta = chunk['choices'][0].get('delta', {})
-                    content = delta.get('content', '')
-                    if content:
-                        self.full_content += content
-                        self.stream_received.emit(content)
-            self.stream_finished.emit(self.full_content)
+            for delta in self.ai_client.chat_stream(self.messages):
+                content = delta.content
+                if content:
+                    parts.append(content)
+                    self._invoke('_on_stream_chunk', content)
+            self._invoke('_on_stream_finished', ''.join(parts))
         except Exception as e:
-            self.error_occurred.emit(str(e))
+            self._invoke('_on_error', str(e))
+
+
+# 常见图片格式的magic bytes到MIME类型映射
+_MAGIC_MIME = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+# base64分块编码的块大小 - 3的倍数，块边界不会产生填充字符
+_B64_CHUNK = 57 * 1024
+
+
+def _sniff_mime(raw: bytes) -> str:
+    """按文件头magic bytes检测图片MIME类型，识别不了时回退jpeg"""
+    for magic, mime in _MAGIC_MIME:
+        if raw.startswith(magic):
+            return mime
+    if raw[:4] == b'RIFF' and raw[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/jpeg'
+
+
+def _encode_data_url(raw: bytes) -> str:
+    """
+    分块base64编码为data URL
+
+    大图片一次性编码会产生一份完整的中间拷贝，
+    分块编码让峰值内存只多出一个块的大小
+    """
+    parts = [b'data:', _sniff_mime(raw).encode('ascii'), b';base64,']
+    for i in range(0, len(raw), _B64_CHUNK):
+        parts.append(base64.b64encode(raw[i:i + _B64_CHUNK]))
+    return b''.join(parts).decode('ascii')
+
+
+# 上传图片的长边上限 - 主流视觉模型的输入分辨率上限，
+# 超过只是白白放大上传字节和token数
+_MAX_UPLOAD_DIM = 1568
+
+
+def _compress_for_upload(image: QImage, raw: bytes, mime: str):
+    """
+    超出模型分辨率上限的上传图片降采样并转JPEG q85
+
+    4K原图的base64比压缩后大5-10倍，先压缩再编码，
+    网络字节、JSON序列化和历史内存同步缩小
+
+    Returns:
+        (图片字节, MIME类型, 对应的QImage)
+    """
+    if max(image.width(), image.height()) <= _MAX_UPLOAD_DIM:
+        return raw, mime, image
+
+    scaled = image.scaled(
+        _MAX_UPLOAD_DIM, _MAX_UPLOAD_DIM,
+        Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.SmoothTransformation)
+    buf = QBuffer()
+    buf.open(QIODevice.OpenModeFlag.WriteOnly)
+    if scaled.save(buf, 'JPEG', 85):
+        return bytes(buf.data()), 'image/jpeg', scaled
+    return raw, mime, image
+
+
+@dataclass(slots=True)
+class ImageAttachment:
+    """
+    图片附件 - 持有原始字节和MIME类型
+    base64 data URL比原始字节大33%，因此只在真正发送时
+    才惰性生成一次并缓存，预览阶段不占这份内存
+    """
+    raw: bytes
+    mime: str
+    _data_url: Optional[str] = None
+
+    def data_url(self) -> str:
+        """按需生成data URL（只编码一次）"""
+        if self._data_url is None:
+            self._data_url = _encode_data_url(self.raw)
+        return self._data_url
+
+
+class ImageLoadWorker(QRunnable):
+    """
+    图片加载任务 - 在线程池中读文件、base64编码并解码为QImage
+    QImage可以跨线程使用，QPixmap转换留给GUI线程的完成槽
+    """
+
+    class Signals(QObject):
+        """任务信号载体（QRunnable本身不是QObject）"""
+        # 解码后的QImage、预缩放的预览QImage与附件对象
+        loaded = pyqtSignal(QImage, QImage, object)
+        failed = pyqtSignal(str)
+
+    def __init__(self, file_path: str):
+        super().__init__()
+        self.file_path = file_path
+        self.signals = ImageLoadWorker.Signals()
+
+    def run(self):
+        try:
+            with open(self.file_path, 'rb') as f:
+                raw = f.read()
+
+            # 用sniff出的格式作为解码提示，跳过Qt的逐插件格式探测
+            image = QImage()
+            hint = _sniff_mime(raw).rpartition('/')[2].upper()
+            if not image.loadFromData(raw, hint):
+                self.signals.failed.emit('无法解码图片')
+                return
+
+            # 超出模型分辨率上限的图先降采样转JPEG再往后传
+            raw, mime, image = _compress_for_upload(
+                image, raw, _sniff_mime(raw))
+
+            # 预览缩放也在工作线程做 - 4K图的平滑缩放是多兆像素的
+            # 双线性滤波，放到GUI线程会明显卡顿
+            preview = image.scaledToWidth(
+                200, Qt.TransformationMode.SmoothTransformation)
+            self.signals.loaded.emit(image, preview, ImageAttachment(raw, mime))
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+
+
+# 预渲染的头像pixmap - 每个角色只画一次圆底+emoji，
+# 气泡直接setPixmap，省掉逐气泡的CSS解析和emoji字体回退遍历
+# （QPixmap依赖QApplication，须在首个气泡创建时惰性构建）
+_AVATAR_STYLE = {
+    'user': ('#f093fb', '👤'),
+    'assistant': ('#667eea', '🤖'),
+    'system': ('#667eea', '⚠️'),
+}
+_avatar_cache: Dict[str, QPixmap] = {}
+
+
+def _avatar_pixmap(role: str) -> QPixmap:
+    """获取角色对应的预渲染头像（带缓存）"""
+    pixmap = _avatar_cache.get(role)
+    if pixmap is None:
+        color, emoji = _AVATAR_STYLE.get(role, _AVATAR_STYLE['system'])
+        pixmap = QPixmap(36, 36)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(color))
+        painter.drawEllipse(0, 0, 36, 36)
+        painter.setPen(QColor('#ffffff'))
+        font = painter.font()
+        font.setPointSize(14)
+        painter.setFont(font)
+        painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter, emoji)
+        painter.end()
+        _avatar_cache[role] = pixmap
+    return pixmap
+
+
+# 气泡样式表 - 模块级常量，每个气泡复用同一字符串，
+# 避免逐气泡f-string拼接和Qt的重复CSS解析
+_BUBBLE_FRAME_QSS = """
+    QFrame {
+        background-color: transparent;
+    }
+"""
+
+_CONTENT_QSS_TMPL = """
+    QWidget {{
+        background-color: {color};
+        border-radius: 16px;
+        padding: 12px 16px;
+        max-width: 300%;
+    }}
+"""
+_USER_CONTENT_QSS = _CONTENT_QSS_TMPL.format(color='#f5576c')
+_ASSIST_CONTENT_QSS = _CONTENT_QSS_TMPL.format(color='#16213e')
+
+_TEXT_LABEL_QSS = """
+    QLabel {
+        color: #eaeaea;
+        font-size: 14px;
+        line-height: 1.6;
+    }
+"""
+
+_STREAM_TEXT_QSS = """
+    QTextEdit {
+        color: #eaeaea;
+        font-size: 14px;
+        background-color: transparent;
+        border: none;
+    }
+"""
 
 
 class MessageBubble(QFrame):
@@ -129,45 +397,47 @@ class MessageBubble(QFrame):
         self.streamable = streamable
         self.text_label = None
         self.content_widget = None
+        self._cursor = None  # 流式QTextEdit的插入游标
+        # 延迟装载的图片 - (占位label, data URL)，首次显示时才解码
+        self._pending_images: List = []
         self.setup_ui()
 
     def update_content(self, text: str):
         """更新文本内容（用于流式输出）"""
         if self.text_label and self.streamable:
-            self.text_label.setText(text)
+            self.text_label.setPlainText(text)
             self.content = text
+            self._adjust_stream_height()
 
     def append_content(self, text: str):
-        """追加文本内容（用于流式输出）"""
-        if self.text_label and self.streamable:
-            current = self.text_label.text()
-            self.text_label.setText(current + text)
-            self.content = current + text
+        """追加文本内容（用于流式输出）
+
+        cursor.insertText只追加新片段，O(片段)；
+        QLabel的取全文+setText方案在长回复上是O(N^2)
+        """
+        if self._cursor is not None and self.streamable:
+            self._cursor.movePosition(QTextCursor.MoveOperation.End)
+            self._cursor.insertText(text)
+            self.content = (self.content or '') + text
+            self._adjust_stream_height()
+
+    def _adjust_stream_height(self):
+        """让流式QTextEdit随内容增高（滚动条已关闭）"""
+        if self.text_label is not None:
+            doc_height = self.text_label.document().size().height()
+            self.text_label.setFixedHeight(int(doc_height) + 10)
 
     def setup_ui(self):
         """设置UI"""
         layout = QHBoxLayout(self)
         layout.setContentsMargins(10, 8, 10, 8)
 
-        # 头像
+        # 头像 - 直接用预渲染pixmap
         avatar = QLabel()
         avatar.setFixedSize(36, 36)
+        avatar.setPixmap(_avatar_pixmap(self.role))
 
-        if self.role == 'user':
-            avatar.setText('👤')
-        elif self.role == 'assistant':
-            avatar.setText('🤖')
-        else:
-            avatar.setText('⚠️')
-
-        avatar.setStyleSheet(f"""
-            QLabel {{
-                font-size: 18px;
-                background-color: {'#f093fb' if self.role == 'user' else '#667eea'};
-                border-radius: 18px;
-                qproperty-alignment: AlignCenter;
-            }}
-        """)
+        is_user = self.role == 'user'
 
         # 内容
         content_widget = QWidget()
@@ -179,11 +449,11 @@ class MessageBubble(QFrame):
         if isinstance(self.content, list):
             for item in self.content:
                 if item.get('type') == 'image_url':
+                    # 占位label先进布局，真实pixmap等首次显示再解码
                     image_label = QLabel()
-                    pixmap = self._base64_to_pixmap(item['image_url']['url'])
-                    if pixmap:
-                        scaled_pixmap = pixmap.scaledToWidth(300, Qt.TransformationMode.SmoothTransformation)
-                        image_label.setPixmap(scaled_pixmap)
+                    image_label.setMinimumSize(300, 180)
+                    self._pending_images.append(
+                        (image_label, item['image_url']['url']))
                     content_layout.addWidget(image_label)
                 elif item.get('type') == 'text':
                     text_label = self._create_text_label(item['text'])
@@ -193,14 +463,10 @@ class MessageBubble(QFrame):
             content_layout.addWidget(text_label)
 
         # 样式
-        self.setStyleSheet(f"""
-            QFrame {{
-                background-color: transparent;
-            }}
-        """)
+        self.setStyleSheet(_BUBBLE_FRAME_QSS)
 
         # 根据角色设置布局方向
-        if self.role == 'user':
+        if is_user:
             layout.addStretch()
             layout.addWidget(content_widget)
             layout.addWidget(avatar)
@@ -209,47 +475,48 @@ class MessageBubble(QFrame):
             layout.addWidget(content_widget)
             layout.addStretch()
 
-        content_widget.setStyleSheet(f"""
-            QWidget {{
-                background-color: {'#f5576c' if self.role == 'user' else '#16213e'};
-                border-radius: 16px;
-                padding: 12px 16px;
-                max-width: 300%;
-            }}
-        """)
+        content_widget.setStyleSheet(
+            _USER_CONTENT_QSS if is_user else _ASSIST_CONTENT_QSS)
+
+    def showEvent(self, event):
+        """首次显示时才解码图片，离屏重建的历史气泡不付解码成本"""
+        if self._pending_images:
+            for label, url in self._pending_images:
+                # 共享缓存 - 同一图片多次渲染只解码/缩放一次
+                scaled = image_cache.scaled_pixmap(url, 300)
+                if scaled:
+                    label.setMinimumSize(0, 0)
+                    label.setPixmap(scaled)
+            self._pending_images.clear()
+        super().showEvent(event)
+
+    def _create_text_label(self, text: str) -> QWidget:
+        """创建文本控件（流式气泡用QTextEdit支持O(片段)追加）"""
+        if self.streamable and self.text_label is None:
+            edit = QTextEdit()
+            edit.setReadOnly(True)
+            edit.setFrameShape(QFrame.Shape.NoFrame)
+            edit.setVerticalScrollBarPolicy(
+                Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+            edit.setHorizontalScrollBarPolicy(
+                Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+            edit.setStyleSheet(_STREAM_TEXT_QSS)
+            if text:
+                edit.setPlainText(text)
+            self.text_label = edit
+            self._cursor = edit.textCursor()
+            self._adjust_stream_height()
+            return edit
 
-    def _create_text_label(self, text: str) -> QLabel:
-        """创建文本标签"""
         label = QLabel(text)
         label.setWordWrap(True)
         label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
-        label.setStyleSheet("""
-            QLabel {
-                color: #eaeaea;
-                font-size: 14px;
-                line-height: 1.6;
-            }
-        """)
+        label.setStyleSheet(_TEXT_LABEL_QSS)
         # 保存文本标签引用（用于流式更新）
         if not self.text_label:
             self.text_label = label
         return label
 
-    def _base64_to_pixmap(self, data_url: str) -> QPixmap:
-        """将base64 data URL转换为QPixmap"""
-        try:
-            if data_url.startswith('data:'):
-                # 移除data URL前缀
-                parts = data_url.split(',')
-                if len(parts) == 2:
-                    import base64
-                    image_data = base64.b64decode(parts[1])
-                    pixmap = QPixmap()
-                    pixmap.loadFromData(image_data)
-                    return pixmap
-        except Exception as e:
-            print(f'图片加载失败: {e}')
-        return None
 
 
 class ChatWindow(QMainWindow):
@@ -261,10 +528,22 @@ class ChatWindow(QMainWindow):
         self.config_manager = config_manager
         self.config = config
         self.floating_widget = floating_widget
-        self.current_image = None
+        self.current_image = None  # ImageAttachment或data URL字符串
+        self._pending_pixmap = None  # 附件对应的已解码QPixmap，发送时种入缓存
+        # 截图线程（懒启动）- mss句柄在工作线程内创建并跨截图复用
+        self._shot_thread = None
+        self._shot_worker = None
+        self._scroll_pending = False  # 布局完成后需要滚动到底部
         self.is_loading = False
         self.assistant_bubble = None
 
+        # 虚拟化列表模式（ui.virtualList开启时由_create_chat_area赋值）
+        self.chat_list = None
+        self.chat_model = None
+        # 气泡容器及底部stretch项（非虚拟化模式下由_create_chat_area赋值）
+        self.chat_container = None
+        self._bottom_stretch = None
+
         # 创建日志记录器
         self.logger = ChatLogger()
 
@@ -278,6 +557,20 @@ class ChatWindow(QMainWindow):
             on_stream=self._on_stream_chunk
         )
 
+        # 待插入的消息气泡 - 单个零延时定时器把连续append合并为一次布局
+        self._pending_bubbles: List[MessageBubble] = []
+        self._append_timer = QTimer(self)
+        self._append_timer.setSingleShot(True)
+        self._append_timer.setInterval(0)
+        self._append_timer.timeout.connect(self._flush_pending_bubbles)
+
+        # 流式输出缓冲 - 40ms定时器合并token片段，
+        # 气泡最多按~25fps重排版而不是每个token一次
+        self._stream_buf: List[str] = []
+        self._stream_timer = QTimer(self)
+        self._stream_timer.setInterval(40)
+        self._stream_timer.timeout.connect(self._flush_stream)
+
         self.setup_ui()
         self.setup_shortcuts()
 
@@ -401,8 +694,14 @@ class ChatWindow(QMainWindow):
 
         return toolbar
 
-    def _create_chat_area(self) -> QScrollArea:
+    def _create_chat_area(self) -> QWidget:
         """创建聊天区域"""
+        # 虚拟化列表模式 - 只绘制可见行，长对话滚动开销恒定
+        if self.config.get('ui', {}).get('virtualList'):
+            from src.ui.chat_view import create_chat_view
+            self.chat_list, self.chat_model, _ = create_chat_view(self)
+            return self.chat_list
+
         scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
         scroll_area.setStyleSheet("""
@@ -439,8 +738,15 @@ class ChatWindow(QMainWindow):
         container_layout.addWidget(welcome)
 
         container_layout.addStretch()
+        # 记住底部stretch项 - 追加气泡时O(1)摘除/放回，无需从尾部扫描
+        self._bottom_stretch = container_layout.itemAt(
+            container_layout.count() - 1)
 
         scroll_area.setWidget(self.chat_container)
+        # 滚动范围更新时再滚动到底部 - 信号携带的最大值保证是新的，
+        # 既不会按过期的最大值滚动，也不用定时器干等
+        scroll_area.verticalScrollBar().rangeChanged.connect(
+            self._on_scroll_range_changed)
         return scroll_area
 
     def _create_input_area(self) -> QWidget:
@@ -468,7 +774,12 @@ class ChatWindow(QMainWindow):
         self.message_input = QTextEdit()
         self.message_input.setPlaceholderText('输入消息...')
         self.message_input.setMaximumHeight(150)
-        self.message_input.textChanged.connect(self._auto_resize)
+        # 30ms单发定时器合并连续击键，避免每个字符都触发一次布局
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(30)
+        self._resize_timer.timeout.connect(self._auto_resize)
+        self.message_input.textChanged.connect(self._resize_timer.start)
 
         # 截图按钮
         screenshot_btn = QPushButton('📷')
@@ -519,23 +830,23 @@ class ChatWindow(QMainWindow):
         pass
 
     def closeEvent(self, event):
-        """窗口关闭事件 - 保存日志"""
+        """窗口关闭事件 - 日志已增量写入，这里只收尾"""
         try:
-            messages = self.agent.get_messages()
-
-            if messages:
-                # 打印到控制台
-                self.logger.log_to_console(messages)
-
-                # 保存到文件
-                filepath = self.logger.save_messages(messages)
+            filepath = self.logger.close()
+            if filepath:
                 print(f"日志已保存到: {filepath}")
             else:
                 print("没有对话历史需要保存")
-
         except Exception as e:
             print(f"保存日志失败: {e}")
 
+        # 停掉截图线程
+        if self._shot_thread is not None:
+            self._shot_thread.quit()
+            self._shot_thread.wait()
+            self._shot_thread = None
+            self._shot_worker = None
+
         super().closeEvent(event)
 
     def eventFilter(self, obj, event):
@@ -546,10 +857,22 @@ class ChatWindow(QMainWindow):
                 return True
         return super().eventFilter(obj, event)
 
+    def _on_scroll_range_changed(self, _minimum: int, maximum: int):
+        """滚动范围变化 - 有待滚动标记时直接滚到新的底部"""
+        if self._scroll_pending:
+            self._scroll_pending = False
+            self.chat_area.verticalScrollBar().setSliderPosition(maximum)
+
     def _auto_resize(self):
-        """自动调整输入框高度"""
-        height = self.message_input.document().size().height()
-        self.message_input.setFixedHeight(int(min(height + 30, 150)))
+        """自动调整输入框高度
+
+        用行数×行高估算，blockCount只是个计数器，
+        不像document().size()那样强制整篇文档重新排版
+        """
+        line_count = self.message_input.document().blockCount()
+        line_spacing = self.message_input.fontMetrics().lineSpacing()
+        self.message_input.setFixedHeight(
+            min(line_count * line_spacing + 30, 150))
 
     def send_message(self):
         """发送消息"""
@@ -563,15 +886,25 @@ class ChatWindow(QMainWindow):
 
         # 构建用户消息内容
         if self.current_image:
+            # 附件在这里才惰性生成data URL，并顺带把已解码的
+            # QPixmap种入共享缓存，气泡渲染无需重新解码
+            if isinstance(self.current_image, ImageAttachment):
+                image_url = self.current_image.data_url()
+                if self._pending_pixmap is not None:
+                    image_cache.put_pixmap(image_url, self._pending_pixmap)
+                    self._pending_pixmap = None
+            else:
+                image_url = self.current_image
             user_content = [
                 {'type': 'text', 'text': text or '请分析这张图片'},
-                {'type': 'image_url', 'image_url': {'url': self.current_image}}
+                {'type': 'image_url', 'image_url': {'url': image_url}}
             ]
         else:
             user_content = text
 
         # 先在Agent中添加用户消息
         self.agent.add_message(MessageRole.USER, user_content)
+        self.logger.append_message({'role': 'user', 'content': user_content})
 
         # 显示用户消息（在发送前显示）
         self._append_message('user', user_content)
@@ -589,12 +922,9 @@ class ChatWindow(QMainWindow):
         self.send_btn.setEnabled(False)
         self.send_btn.setText('发送中...')
 
-        # 创建线程 - 使用Agent的messages（现在已经包含用户消息）
-        self.chat_thread = ChatThread(self.ai_client, self.agent.get_messages())
-        self.chat_thread.stream_received.connect(self._on_stream_chunk)
-        self.chat_thread.stream_finished.connect(self._on_stream_finished)
-        self.chat_thread.error_occurred.connect(self._on_error)
-        self.chat_thread.start()
+        # 提交到全局线程池 - 使用Agent的messages（现在已经包含用户消息）
+        worker = ChatRequestWorker(self.ai_client, self.agent.get_messages(), self)
+        QThreadPool.globalInstance().start(worker)
 
     def _on_response(self, response):
         """处理响应（已弃用，保留用于兼容性）"""
@@ -607,17 +937,36 @@ class ChatWindow(QMainWindow):
         self.agent.add_message(MessageRole.ASSISTANT, assistant_content)
         self._append_message('assistant', assistant_content)
 
+    @pyqtSlot(str)
     def _on_stream_chunk(self, chunk: str):
-        """处理流式响应片段"""
+        """处理流式响应片段（仅入缓冲，实际刷新由定时器合并执行）"""
+        self._stream_buf.append(chunk)
+        if not self._stream_timer.isActive():
+            self._stream_timer.start()
+
+    def _flush_stream(self):
+        """把缓冲的流式片段一次性刷进气泡"""
+        if not self._stream_buf:
+            self._stream_timer.stop()
+            return
+        text = ''.join(self._stream_buf)
+        self._stream_buf.clear()
+
+        if self.chat_model is not None:
+            self.chat_model.append_to_last(text)
+            self.chat_list.scrollToBottom()
+            return
         if self.assistant_bubble:
-            self.assistant_bubble.append_content(chunk)
-            # 自动滚动到底部
-            QTimer.singleShot(10, lambda: self.chat_area.verticalScrollBar().setValue(
-                self.chat_area.verticalScrollBar().maximum()
-            ))
+            self.assistant_bubble.append_content(text)
+            # 滚动范围更新后由rangeChanged回调滚动到底部
+            self._scroll_pending = True
 
+    @pyqtSlot(str)
     def _on_stream_finished(self, full_content: str):
         """流式响应完成"""
+        # 把缓冲里剩余的片段刷完再收尾
+        self._flush_stream()
+        self._stream_timer.stop()
         self.is_loading = False
         self.send_btn.setEnabled(True)
         self.send_btn.setText('发送')
@@ -625,8 +974,13 @@ class ChatWindow(QMainWindow):
         # 保存完整消息到Agent历史（仅当内容非空时）
         if full_content and full_content.strip():
             self.agent.add_message(MessageRole.ASSISTANT, full_content)
+            self.logger.append_message(
+                {'role': 'assistant', 'content': full_content})
+            # 这轮图片已经被模型看过，后续轮次不再重传base64
+            self.agent.strip_old_images()
         self.assistant_bubble = None
 
+    @pyqtSlot(str)
     def _on_error(self, error):
         """处理错误"""
         self.is_loading = False
@@ -636,84 +990,133 @@ class ChatWindow(QMainWindow):
         self._append_message('system', f'错误: {error}')
 
     def _append_message(self, role: str, content, streamable: bool = False):
-        """追加消息"""
+        """追加消息（实际插入由定时器批量执行，连续追加只触发一次布局）"""
+        # 虚拟化列表模式 - 仅向模型插入一行
+        if self.chat_model is not None:
+            self.chat_model.append_message(role, content)
+            self.chat_list.scrollToBottom()
+            return None
+
         message_bubble = MessageBubble(role, content, streamable=streamable)
-        container_layout = self.chat_container.layout()
+        self._pending_bubbles.append(message_bubble)
+        self._append_timer.start()
+        return message_bubble
 
-        # 移除最后一个stretch
-        while container_layout.count() > 0:
-            item = container_layout.takeAt(container_layout.count() - 1)
-            if isinstance(item, QSpacerItem):
-                # 是spacer，不再放回去
-                continue
-            else:
-                container_layout.addItem(item)
-                break
+    def _flush_pending_bubbles(self):
+        """把积压的气泡一次性插入布局，并只滚动一次"""
+        if not self._pending_bubbles:
+            return
 
-        container_layout.addWidget(message_bubble)
-        container_layout.addStretch()
+        container_layout = self.chat_container.layout()
+        self.chat_container.setUpdatesEnabled(False)
+        try:
+            # O(1)摘下底部stretch，插完气泡再放回
+            container_layout.removeItem(self._bottom_stretch)
 
-        # 滚动到底部
-        QTimer.singleShot(100, lambda: self.chat_area.verticalScrollBar().setValue(
-            self.chat_area.verticalScrollBar().maximum()
-        ))
+            for bubble in self._pending_bubbles:
+                container_layout.addWidget(bubble)
+            self._pending_bubbles.clear()
 
-        return message_bubble
+            container_layout.addItem(self._bottom_stretch)
+        finally:
+            self.chat_container.setUpdatesEnabled(True)
+
+        # 滚动范围更新后由rangeChanged回调滚动到底部（整批只滚一次）
+        self._scroll_pending = True
 
     def _remove_welcome_message(self):
         """移除欢迎消息"""
+        if self.chat_model is not None:
+            return
         container_layout = self.chat_container.layout()
-        for i in reversed(range(container_layout.count())):
-            item = container_layout.itemAt(i)
-            widget = item.widget()
-            if widget and isinstance(widget, QLabel) and '欢迎' in widget.text():
-                container_layout.removeWidget(widget)
-                widget.deleteLater()
-                break
-
-    def capture_screenshot(self):
-        """截取屏幕"""
+        # 挂起重绘，移除与后续布局只触发一次绘制
+        self.chat_container.setUpdatesEnabled(False)
         try:
-            # 隐藏窗口以避免截图包含本应用
-            self.hide()
-
-            # 延迟一下确保窗口已隐藏
-            import time
-            time.sleep(0.2)
+            for i in reversed(range(container_layout.count())):
+                item = container_layout.itemAt(i)
+                widget = item.widget()
+                if widget and isinstance(widget, QLabel) and '欢迎' in widget.text():
+                    container_layout.removeWidget(widget)
+                    widget.deleteLater()
+                    break
+        finally:
+            self.chat_container.setUpdatesEnabled(True)
 
-            capture = ScreenshotCapture()
-            base64_img = capture.capture_to_base64()
-            if base64_img:
-                self.current_image = base64_img
-                self._show_image_preview(base64_img)
+    def capture_screenshot(self):
+        """截取屏幕（抓取与编码在后台线程完成，界面不再停顿）"""
+        # 隐藏窗口以避免截图包含本应用，200ms后从后台线程抓取
+        self.hide()
+        QTimer.singleShot(200, self._start_screenshot)
+
+    def _start_screenshot(self):
+        """向截图线程排队一次截图"""
+        if self._shot_thread is None:
+            self._shot_thread = QThread(self)
+            self._shot_worker = ScreenshotWorker()
+            self._shot_worker.moveToThread(self._shot_thread)
+            self._shot_worker.captured_bytes.connect(
+                self._on_screenshot_captured)
+            self._shot_thread.start()
+        QMetaObject.invokeMethod(
+            self._shot_worker, 'run_to_bytes',
+            Qt.ConnectionType.QueuedConnection)
+
+    @pyqtSlot(object)
+    def _on_screenshot_captured(self, result):
+        """截图完成 - 恢复窗口并把结果装成附件"""
+        self.show()
+        self.activateWindow()
+        self.raise_()
+
+        if result is None:
+            QMessageBox.warning(self, '截图失败', '无法捕获屏幕')
+            return
 
-            # 显示窗口
-            self.show()
-            self.activateWindow()
-            self.raise_()
-        except Exception as e:
-            self.show()
-            QMessageBox.warning(self, '截图失败', str(e))
+        raw, mime = result
+        self.current_image = ImageAttachment(raw, mime)
+        # 截图已压缩到≤1600px，GUI线程解码+缩放在可接受范围内；
+        # 预览是临时小图，用FastTransformation省掉CPU双线性滤波
+        pixmap = QPixmap()
+        pixmap.loadFromData(raw)
+        self._pending_pixmap = pixmap
+        self._show_image_preview(pixmap.scaledToWidth(
+            200, Qt.TransformationMode.FastTransformation))
 
     def upload_image(self):
-        """上传图片"""
+        """上传图片（读取/编码/解码在线程池中完成，不阻塞界面）"""
         file_path, _ = QFileDialog.getOpenFileName(
             self, '选择图片', '', '图片文件 (*.png *.jpg *.jpeg *.gif *.webp)'
         )
         if file_path:
-            try:
-                import base64
-                with open(file_path, 'rb') as f:
-                    image_data = base64.b64encode(f.read()).decode('utf-8')
-                self.current_image = f'data:image/jpeg;base64,{image_data}'
-                self._show_image_preview(self.current_image)
-            except Exception as e:
-                QMessageBox.warning(self, '上传失败', str(e))
-
-    def _show_image_preview(self, data_url: str):
-        """显示图片预览"""
-        self.image_preview_container.setVisible(True)
+            worker = ImageLoadWorker(file_path)
+            worker.signals.loaded.connect(self._on_image_loaded)
+            worker.signals.failed.connect(self._on_image_load_failed)
+            QThreadPool.globalInstance().start(worker)
+
+    def _on_image_loaded(self, image: QImage, preview: QImage, attachment):
+        """后台图片加载完成 - 暂存附件与解码结果，预览直接用预缩放图"""
+        self.current_image = attachment
+        self._pending_pixmap = QPixmap.fromImage(image)
+        self._show_image_preview(QPixmap.fromImage(preview))
+
+    def _on_image_load_failed(self, error: str):
+        """后台图片加载失败"""
+        QMessageBox.warning(self, '上传失败', error)
+
+    def _show_image_preview(self, scaled: Optional[QPixmap]):
+        """显示图片预览（直接接收已缩放的QPixmap）"""
+        container = self.image_preview_container
+        container.setVisible(True)
+
+        # 挂起重绘，清旧预览+加新预览合并为一次绘制
+        container.setUpdatesEnabled(False)
+        try:
+            self._build_image_preview(scaled)
+        finally:
+            container.setUpdatesEnabled(True)
 
+    def _build_image_preview(self, scaled: Optional[QPixmap]):
+        """重建预览区内容"""
         # 清除旧预览
         preview_layout = self.image_preview_container.layout()
         while preview_layout.count():
@@ -722,14 +1125,11 @@ class ChatWindow(QMainWindow):
             if widget:
                 widget.deleteLater()
 
-        # 创建预览
         layout = preview_layout
 
-        pixmap = self._base64_to_pixmap(data_url)
-        if pixmap:
-            scaled_pixmap = pixmap.scaledToWidth(200, Qt.TransformationMode.SmoothTransformation)
+        if scaled:
             image_label = QLabel()
-            image_label.setPixmap(scaled_pixmap)
+            image_label.setPixmap(scaled)
             image_label.setAlignment(Qt.AlignmentFlag.AlignLeft)
 
             # 移除按钮
@@ -748,6 +1148,7 @@ class ChatWindow(QMainWindow):
     def _remove_image_preview(self):
         """移除图片预览"""
         self.current_image = None
+        self._pending_pixmap = None
         self.image_preview_container.setVisible(False)
         preview_layout = self.image_preview_container.layout()
         while preview_layout.count():
@@ -756,20 +1157,6 @@ class ChatWindow(QMainWindow):
             if widget:
                 widget.deleteLater()
 
-    def _base64_to_pixmap(self, data_url: str) -> QPixmap:
-        """将base64 data URL转换为QPixmap"""
-        try:
-            if data_url.startswith('data:'):
-                parts = data_url.split(',')
-                if len(parts) == 2:
-                    import base64
-                    image_data = base64.b64decode(parts[1])
-                    pixmap = QPixmap()
-                    pixmap.loadFromData(image_data)
-                    return pixmap
-        except Exception as e:
-            print(f'图片加载失败: {e}')
-        return None
 
     def minimize_to_floating(self):
         """缩小为悬浮助手"""
@@ -779,120 +1166,11 @@ class ChatWindow(QMainWindow):
 
     def show_settings(self):
         """显示设置对话框"""
+        # 延迟导入 - 对话框模块只在用户真正打开设置时加载
+        from src.ui.settings_dialog import SettingsDialog
         dialog = SettingsDialog(self.config_manager, self)
         dialog.exec()
         if dialog.saved:
             # 重新加载配置
             self.config = self.config_manager.load_config()
             self.ai_client.update_config(self.config['ai'])
-
-
-class SettingsDialog(QDialog):
-    """设置对话框"""
-
-    def __init__(self, config_manager, parent=None):
-        super().__init__(parent)
-        self.config_manager = config_manager
-        self.saved = False
-        self.setup_ui()
-
-    def setup_ui(self):
-        """设置UI"""
-        self.setWindowTitle('设置')
-        self.setFixedSize(500, 400)
-        self.setStyleSheet("""
-            QDialog {
-                background-color: #1a1a2e;
-                color: #eaeaea;
-            }
-            QLabel {
-                font-size: 14px;
-                color: #a0a0a0;
-                margin-bottom: 8px;
-            }
-            QLineEdit, QDoubleSpinBox {
-                background-color: #0f3460;
-                border: 1px solid #2a2a4a;
-                border-radius: 8px;
-                padding: 10px;
-                color: #eaeaea;
-                font-size: 14px;
-            }
-            QLineEdit:focus, QDoubleSpinBox:focus {
-                border-color: #e94560;
-            }
-        """)
-
-        layout = QVBoxLayout(self)
-        layout.setSpacing(20)
-        layout.setContentsMargins(30, 30, 30, 30)
-
-        # 标题
-        title = QLabel('设置')
-        title.setStyleSheet('font-size: 24px; font-weight: 600; color: #eaeaea; margin-bottom: 20px;')
-        layout.addWidget(title)
-
-        # API URL
-        self.api_url_input = QLineEdit()
-        self.api_url_input.setPlaceholderText('https://dashscope.aliyuncs.com/compatible-mode/v1')
-        self.api_url_input.setText(self.config_manager.get('ai.baseUrl', ''))
-        layout.addWidget(QLabel('API URL'))
-        layout.addWidget(self.api_url_input)
-
-        # API Key
-        self.api_key_input = QLineEdit()
-        self.api_key_input.setEchoMode(QLineEdit.EchoMode.Password)
-        self.api_key_input.setPlaceholderText('输入你的 API Key')
-        self.api_key_input.setText(self.config_manager.get('ai.apiKey', ''))
-        layout.addWidget(QLabel('API Key'))
-        layout.addWidget(self.api_key_input)
-
-        # 模型
-        self.model_input = QLineEdit()
-        self.model_input.setPlaceholderText('qwen-vl-max')
-        self.model_input.setText(self.config_manager.get('ai.model', ''))
-        layout.addWidget(QLabel('模型'))
-        layout.addWidget(self.model_input)
-
-        # 温度
-        self.temperature_input = QDoubleSpinBox()
-        self.temperature_input.setRange(0, 2)
-        self.temperature_input.setSingleStep(0.1)
-        self.temperature_input.setValue(self.config_manager.get('ai.temperature', 0.7))
-        layout.addWidget(QLabel('温度 (0-2)'))
-        layout.addWidget(self.temperature_input)
-
-        layout.addStretch()
-
-        # 按钮
-        button_layout = QHBoxLayout()
-        button_layout.addStretch()
-
-        cancel_btn = QPushButton('取消')
-        cancel_btn.clicked.connect(self.reject)
-
-        save_btn = QPushButton('保存')
-        save_btn.clicked.connect(self.save)
-
-        button_layout.addWidget(cancel_btn)
-        button_layout.addWidget(save_btn)
-
-        layout.addLayout(button_layout)
-
-    def save(self):
-        """保存设置"""
-        new_config = {
-            'ai': {
-                'baseUrl': self.api_url_input.text(),
-                'apiKey': self.api_key_input.text(),
-                'model': self.model_input.text(),
-                'temperature': self.temperature_input.value()
-            }
-        }
-
-        self.config_manager.save_config({
-            **self.config_manager.config,
-            **new_config
-        })
-        self.saved = True
-        self.accept()
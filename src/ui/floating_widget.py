@@ -4,9 +4,9 @@
 桌面悬浮助手
 """
 
-from PyQt6.QtWidgets import QWidget, QLabel, QVBoxLayout
-from PyQt6.QtCore import Qt, QTimer, QPoint, QRect, QPointF
-from PyQt6.QtGui import QPainter, QColor, QRadialGradient, QBrush, QPen
+from PyQt6.QtWidgets import QApplication, QWidget
+from PyQt6.QtCore import Qt, QTimer, QPoint, QRect, QRectF, QPointF
+from PyQt6.QtGui import QGuiApplication, QPainter, QColor, QRadialGradient, QBrush, QPen, QPixmap, QFont, QMouseEvent, QPainterPath
 
 
 class FloatingWidget(QWidget):
@@ -20,143 +20,190 @@ class FloatingWidget(QWidget):
         self.chat_window = chat_window
         self.drag_position = None
         self.click_start_pos = None
-        self.max_click_distance = 5  # 最大点击移动距离，超过则视为拖动
+        # 点击/拖动判定阈值取平台标准拖动距离（平方缓存，释放时直接比较）
+        self._click_threshold_sq = QApplication.startDragDistance() ** 2
+
+        # 拖动移动合并定时器 - 高频鼠标事件(120Hz+)只记录目标位置，
+        # 每16ms真正move一次，和屏幕刷新率对齐
+        self._move_target = None
+        self._move_timer = QTimer(self)
+        self._move_timer.setInterval(16)
+        self._move_timer.timeout.connect(self._apply_move)
 
         self.setup_ui()
 
     def setup_ui(self):
         """设置UI"""
-        # 设置窗口属性
-        self.setFixedSize(80, 80)
+        # 设置窗口属性 - 固定为悬浮态的最大尺寸，悬浮放大只切换
+        # 绘制的圆盘直径，不再resize窗口（resize会触发整条
+        # 重布局+窗口管理器几何协商链路）
+        self.setFixedSize(85, 85)
+        self._hovered = False
         self.setWindowFlags(
             Qt.WindowType.FramelessWindowHint |
             Qt.WindowType.WindowStaysOnTopHint |
             Qt.WindowType.Tool
         )
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        # 跳过paintEvent前Qt自动的背景填充，背景完全由贴图负责
+        self.setAttribute(Qt.WidgetAttribute.WA_NoSystemBackground)
+        # 内容静态（只随悬浮态整体切换），移动/尺寸协商时不请求重绘
+        self.setAttribute(Qt.WidgetAttribute.WA_StaticContents)
         self.setCursor(Qt.CursorShape.OpenHandCursor)
 
-        # 设置位置到屏幕右下角
-        screen = self.screen().availableGeometry()
-        self.move(
-            screen.width() - 120,
-            screen.height() - 120
-        )
-
-        # 创建内容
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-
-        # 助手图标
-        self.icon_label = QLabel('🤖')
-        self.icon_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.icon_label.setStyleSheet("""
-            QLabel {
-                font-size: 36px;
-                background: transparent;
-            }
-        """)
-        layout.addWidget(self.icon_label)
-
-        # 设置背景为圆角
-        self.setStyleSheet("""
-            QWidget {
-                background: qlineargradient(
-                    x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #667eea,
-                    stop:1 #764ba2
-                );
-                border-radius: 40px;
-            }
-        """)
+        # 设置位置到主屏右下角 - 用可用区域的right/bottom定位，
+        # 多显示器下原点有偏移时width/height算出的坐标会落错屏
+        geo = QGuiApplication.primaryScreen().availableGeometry()
+        self.move(geo.right() - 120, geo.bottom() - 120)
+
+        # 图标直接合成进背景位图，整个控件无子部件、无布局 -
+        # 省掉QLabel的事件分发/样式处理和每次重绘的两层合成
+
+        # 预构建画笔 - 背景位图重建时复用
+        self._border_pen = QPen(QColor('#8888cc'), 2)
+        # 按圆盘直径缓存预渲染的背景位图（普通80px/悬浮85px各一张）
+        self._bg_cache = {}
+
+    def _icon_pixmap(self):
+        """把emoji图标预渲染为位图（只在启动时栅格化一次）"""
+        size = 48
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(int(size * dpr), int(size * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(pixmap)
+        font = QFont()
+        font.setPixelSize(36)
+        painter.setFont(font)
+        painter.drawText(QRect(0, 0, size, size), Qt.AlignmentFlag.AlignCenter, '🤖')
+        painter.end()
+        return pixmap
+
+    def _bg_pixmap(self):
+        """返回当前状态的预渲染背景位图（渐变+圆角+边框）"""
+        diameter = 85 if self._hovered else 80
+        pixmap = self._bg_cache.get(diameter)
+        if pixmap is None:
+            size = self.size()
+            dpr = self.devicePixelRatioF()
+            pixmap = QPixmap(int(size.width() * dpr), int(size.height() * dpr))
+            pixmap.setDevicePixelRatio(dpr)
+            pixmap.fill(Qt.GlobalColor.transparent)
+
+            # 圆盘在固定窗口内居中
+            offset = (size.width() - diameter) // 2
+            rect = QRect(offset, offset, diameter, diameter)
+            radius = diameter / 2
+            gradient = QRadialGradient(QPointF(rect.center()), radius)
+            gradient.setColorAt(0, QColor('#667eea'))
+            gradient.setColorAt(1, QColor('#764ba2'))
+
+            # 圆盘/边框各构建一次QPainterPath，直接fill/stroke，
+            # 不走drawRoundedRect每次内部重建路径的分支
+            disc_path = QPainterPath()
+            disc_path.addRoundedRect(QRectF(rect), radius, radius)
+            border_path = QPainterPath()
+            border_path.addRoundedRect(
+                QRectF(rect.adjusted(2, 2, -2, -2)), radius - 2, radius - 2)
+
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.fillPath(disc_path, QBrush(gradient))
+            painter.strokePath(border_path, self._border_pen)
+
+            # 图标居中合成进背景，运行期只剩一次整体贴图
+            icon = self._icon_pixmap()
+            icon_size = int(icon.width() / icon.devicePixelRatio())
+            icon_off = (size.width() - icon_size) // 2
+            painter.drawPixmap(icon_off, icon_off, icon)
+            painter.end()
+
+            self._bg_cache[diameter] = pixmap
+        return pixmap
 
     def paintEvent(self, event):
-        """绘制事件 - 绘制圆角和阴影效果"""
+        """绘制事件 - 直接贴预渲染的背景位图，不逐帧走矢量光栅化"""
         super().paintEvent(event)
 
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-
-        # 绘制圆角背景
-        rect = self.rect()
-        gradient = QRadialGradient(QPointF(rect.center()), rect.width() / 2)
-        gradient.setColorAt(0, QColor('#667eea'))
-        gradient.setColorAt(1, QColor('#764ba2'))
-
-        painter.setBrush(QBrush(gradient))
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.drawRoundedRect(rect, 40, 40)
-
-        # 绘制阴影边框
-        pen = QPen(QColor('#8888cc'), 2)
-        painter.setPen(pen)
-        painter.setBrush(Qt.BrushStyle.NoBrush)
-        painter.drawRoundedRect(rect.adjusted(2, 2, -2, -2), 38, 38)
+        painter.drawPixmap(0, 0, self._bg_pixmap())
 
-    def mousePressEvent(self, event):
+    def mousePressEvent(self, event: QMouseEvent) -> None:
         """鼠标按下事件 - 开始拖动"""
         if event.button() == Qt.MouseButton.LeftButton:
-            self.drag_position = event.globalPosition().toPoint() - self.frameGeometry().topLeft()
-            self.click_start_pos = event.globalPosition().toPoint()
+            # 全程保持QPointF运算，只在真正move时转一次整数坐标
+            self.drag_position = event.globalPosition() - QPointF(self.frameGeometry().topLeft())
+            self.click_start_pos = event.globalPosition()
             self.setCursor(Qt.CursorShape.ClosedHandCursor)
             event.accept()
 
-    def mouseMoveEvent(self, event):
-        """鼠标移动事件 - 拖动窗口"""
+    def mouseMoveEvent(self, event: QMouseEvent) -> None:
+        """鼠标移动事件 - 记录拖动目标位置，由定时器合并执行move"""
         if event.buttons() == Qt.MouseButton.LeftButton and self.drag_position:
-            self.move(event.globalPosition().toPoint() - self.drag_position)
+            self._move_target = (event.globalPosition() - self.drag_position).toPoint()
+            if not self._move_timer.isActive():
+                self._move_timer.start()
             event.accept()
 
-    def mouseReleaseEvent(self, event):
+    def _apply_move(self):
+        """应用最近一次记录的拖动位置"""
+        if self._move_target is not None:
+            self.move(self._move_target)
+            self._move_target = None
+
+    def mouseReleaseEvent(self, event: QMouseEvent) -> None:
         """鼠标释放事件"""
         self.setCursor(Qt.CursorShape.OpenHandCursor)
         self.drag_position = None
+        # 停止合并定时器并落到最终位置
+        self._move_timer.stop()
+        self._apply_move()
 
         # 单击效果 - 切换聊天窗口显示/隐藏
         if event.button() == Qt.MouseButton.LeftButton:
             # 判断是点击还是拖动
             if self.click_start_pos:
-                current_pos = event.globalPosition().toPoint()
-                distance = ((current_pos.x() - self.click_start_pos.x()) ** 2 +
-                           (current_pos.y() - self.click_start_pos.y()) ** 2) ** 0.5
+                current_pos = event.globalPosition()
+                # 比较平方距离，省掉开方运算
+                distance_sq = ((current_pos.x() - self.click_start_pos.x()) ** 2 +
+                              (current_pos.y() - self.click_start_pos.y()) ** 2)
 
                 # 如果移动距离很小，视为点击
-                if distance < self.max_click_distance:
+                if distance_sq < self._click_threshold_sq:
                     self.toggle_chat_window()
 
             self.click_start_pos = None
 
-    def toggle_chat_window(self):
+    def toggle_chat_window(self) -> None:
         """切换聊天窗口显示/隐藏"""
         if self.chat_window:
             if self.chat_window.isVisible():
                 self.chat_window.hide()
             else:
                 self.chat_window.show()
-                self.chat_window.raise_()
-                self.chat_window.activateWindow()
+                # 已是活动窗口时跳过置顶/激活，免去两轮窗口管理器往返
+                if not self.chat_window.isActiveWindow():
+                    self.chat_window.raise_()
+                    self.chat_window.activateWindow()
 
     def mouseDoubleClickEvent(self, event):
         """双击事件 - 切换聊天窗口"""
-        if self.chat_window:
-            if self.chat_window.isVisible():
-                self.chat_window.hide()
-            else:
-                self.chat_window.show()
-                self.chat_window.raise_()
-                self.chat_window.activateWindow()
+        self.toggle_chat_window()
         event.accept()
 
     def enterEvent(self, event):
         """鼠标进入事件"""
         self.setCursor(Qt.CursorShape.PointingHandCursor)
-        # 悬浮时放大效果
-        self.setFixedSize(85, 85)
+        # 悬浮放大效果 - 只切换绘制状态并重绘，不改窗口几何
+        self._hovered = True
+        self.update()
         super().enterEvent(event)
 
     def leaveEvent(self, event):
         """鼠标离开事件"""
         self.setCursor(Qt.CursorShape.OpenHandCursor)
         # 恢复大小
-        self.setFixedSize(80, 80)
+        self._hovered = False
+        self.update()
         super().leaveEvent(event)
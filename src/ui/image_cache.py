@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+图片解码缓存
+data URL → QPixmap的共享缓存，消息气泡与预览共用
+同一附件反复渲染时只做一次base64解码和图片解压
+"""
+
+import functools
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from PyQt6.QtCore import QByteArray, Qt
+from PyQt6.QtGui import QPixmap
+
+
+def _format_hint(data_url: str) -> Optional[str]:
+    """
+    从data URL头部取图片格式提示（如'PNG'、'JPEG'）
+
+    传给loadFromData后Qt直接用对应解码器，跳过逐个插件的格式探测
+    """
+    if not data_url.startswith('data:image/'):
+        return None
+    end = data_url.find(';', 11)
+    if end < 0:
+        return None
+    fmt = data_url[11:end].upper()
+    return fmt if fmt.isalnum() else None
+
+
+@functools.lru_cache(maxsize=64)
+def _decode_b64(data_url: str) -> Optional[QByteArray]:
+    """
+    解码data URL的base64负载（按URL缓存）
+
+    用QByteArray.fromBase64直接解码到Qt缓冲区，
+    loadFromData零拷贝接收，省掉Python bytes的中间副本
+
+    Args:
+        data_url: data:image/...;base64,... 格式的字符串
+
+    Returns:
+        解码后的QByteArray，格式不合法返回None
+    """
+    if not data_url.startswith('data:'):
+        return None
+    idx = data_url.find(',')
+    if idx < 0:
+        return None
+    return QByteArray.fromBase64(data_url[idx + 1:].encode('ascii'))
+
+
+# 解码后的QPixmap缓存与缩放变体缓存（LRU有界）
+# QPixmap隐式共享，缓存命中时返回的是廉价的浅拷贝引用
+# 全分辨率pixmap以兆字节计，历史图片在strip_old_images后不再渲染，
+# 必须有上限淘汰，否则随会话无限增长
+_PIXMAP_CACHE_SIZE = 32
+_SCALED_CACHE_SIZE = 64
+_pixmap_cache: OrderedDict[str, QPixmap] = OrderedDict()
+_scaled_cache: OrderedDict[Tuple[str, int], QPixmap] = OrderedDict()
+
+
+def _cache_put(cache: OrderedDict, key, pixmap: QPixmap, maxsize: int) -> None:
+    """写入LRU缓存，超限时淘汰最久未用的条目"""
+    cache[key] = pixmap
+    cache.move_to_end(key)
+    while len(cache) > maxsize:
+        cache.popitem(last=False)
+
+
+def data_url_to_pixmap(data_url: str) -> Optional[QPixmap]:
+    """
+    将base64 data URL转换为QPixmap（带缓存）
+
+    Args:
+        data_url: data URL字符串
+
+    Returns:
+        QPixmap对象，解码失败返回None
+    """
+    pixmap = _pixmap_cache.get(data_url)
+    if pixmap is not None:
+        _pixmap_cache.move_to_end(data_url)
+        return pixmap
+
+    try:
+        raw = _decode_b64(data_url)
+        if raw:
+            pixmap = QPixmap()
+            if pixmap.loadFromData(raw, _format_hint(data_url)):
+                _cache_put(_pixmap_cache, data_url, pixmap, _PIXMAP_CACHE_SIZE)
+                return pixmap
+    except Exception as e:
+        print(f'图片加载失败: {e}')
+    return None
+
+
+def scaled_pixmap(
+    data_url: str,
+    width: int,
+    mode: Qt.TransformationMode = Qt.TransformationMode.SmoothTransformation
+) -> Optional[QPixmap]:
+    """
+    获取按宽度缩放后的QPixmap（带缓存）
+
+    Args:
+        data_url: data URL字符串
+        width: 目标宽度（像素）
+        mode: 缩放插值模式
+
+    Returns:
+        缩放后的QPixmap，解码失败返回None
+    """
+    key = (data_url, width)
+    pixmap = _scaled_cache.get(key)
+    if pixmap is not None:
+        _scaled_cache.move_to_end(key)
+        return pixmap
+
+    source = data_url_to_pixmap(data_url)
+    if source is None:
+        return None
+
+    pixmap = source.scaledToWidth(width, mode)
+    _cache_put(_scaled_cache, key, pixmap, _SCALED_CACHE_SIZE)
+    return pixmap
+
+
+def put_pixmap(data_url: str, pixmap: QPixmap) -> None:
+    """预置已解码的QPixmap（后台线程解码完成后种入缓存，避免重复解码）"""
+    _cache_put(_pixmap_cache, data_url, pixmap, _PIXMAP_CACHE_SIZE)
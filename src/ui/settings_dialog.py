@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+设置对话框
+独立模块，仅在用户打开设置时才导入，不占聊天窗口的冷启动
+"""
+
+from PyQt6.QtWidgets import (
+    QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
+    QDialog, QLineEdit, QDoubleSpinBox
+)
+
+
+class SettingsDialog(QDialog):
+    """设置对话框"""
+
+    def __init__(self, config_manager, parent=None):
+        super().__init__(parent)
+        self.config_manager = config_manager
+        self.saved = False
+        self.setup_ui()
+
+    def setup_ui(self):
+        """设置UI"""
+        self.setWindowTitle('设置')
+        self.setFixedSize(500, 400)
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #1a1a2e;
+                color: #eaeaea;
+            }
+            QLabel {
+                font-size: 14px;
+                color: #a0a0a0;
+                margin-bottom: 8px;
+            }
+            QLineEdit, QDoubleSpinBox {
+                background-color: #0f3460;
+                border: 1px solid #2a2a4a;
+                border-radius: 8px;
+                padding: 10px;
+                color: #eaeaea;
+                font-size: 14px;
+            }
+            QLineEdit:focus, QDoubleSpinBox:focus {
+                border-color: #e94560;
+            }
+        """)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(20)
+        layout.setContentsMargins(30, 30, 30, 30)
+
+        # 标题
+        title = QLabel('设置')
+        title.setStyleSheet('font-size: 24px; font-weight: 600; color: #eaeaea; margin-bottom: 20px;')
+        layout.addWidget(title)
+
+        # API URL
+        self.api_url_input = QLineEdit()
+        self.api_url_input.setPlaceholderText('https://dashscope.aliyuncs.com/compatible-mode/v1')
+        self.api_url_input.setText(self.config_manager.get('ai.baseUrl', ''))
+        layout.addWidget(QLabel('API URL'))
+        layout.addWidget(self.api_url_input)
+
+        # API Key
+        self.api_key_input = QLineEdit()
+        self.api_key_input.setEchoMode(QLineEdit.EchoMode.Password)
+        self.api_key_input.setPlaceholderText('输入你的 API Key')
+        self.api_key_input.setText(self.config_manager.get('ai.apiKey', ''))
+        layout.addWidget(QLabel('API Key'))
+        layout.addWidget(self.api_key_input)
+
+        # 模型
+        self.model_input = QLineEdit()
+        self.model_input.setPlaceholderText('qwen-vl-max')
+        self.model_input.setText(self.config_manager.get('ai.model', ''))
+        layout.addWidget(QLabel('模型'))
+        layout.addWidget(self.model_input)
+
+        # 温度
+        self.temperature_input = QDoubleSpinBox()
+        self.temperature_input.setRange(0, 2)
+        self.temperature_input.setSingleStep(0.1)
+        self.temperature_input.setValue(self.config_manager.get('ai.temperature', 0.7))
+        layout.addWidget(QLabel('温度 (0-2)'))
+        layout.addWidget(self.temperature_input)
+
+        layout.addStretch()
+
+        # 按钮
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+
+        cancel_btn = QPushButton('取消')
+        cancel_btn.clicked.connect(self.reject)
+
+        save_btn = QPushButton('保存')
+        save_btn.clicked.connect(self.save)
+
+        button_layout.addWidget(cancel_btn)
+        button_layout.addWidget(save_btn)
+
+        layout.addLayout(button_layout)
+
+    def save(self):
+        """保存设置"""
+        new_config = {
+            'ai': {
+                'baseUrl': self.api_url_input.text(),
+                'apiKey': self.api_key_input.text(),
+                'model': self.model_input.text(),
+                'temperature': self.temperature_input.value()
+            }
+        }
+
+        self.config_manager.save_config({
+            **self.config_manager.config,
+            **new_config
+        })
+        self.saved = True
+        self.accept()